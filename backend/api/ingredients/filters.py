@@ -1,5 +1,29 @@
-from rest_framework.filters import SearchFilter
+from rest_framework import exceptions
+from rest_framework.filters import BaseFilterBackend
 
+from ingredients.search import AUTOCOMPLETE_LIMIT, autocomplete
 
-class IngredientSearchFilter(SearchFilter):
+
+class IngredientSearchFilter(BaseFilterBackend):
     search_param = 'name'
+    limit_param = 'limit'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query or view.action != 'list':
+            return queryset
+        return autocomplete(query, self.get_limit(request))
+
+    def get_limit(self, request):
+        limit = request.query_params.get(self.limit_param)
+        if limit is None:
+            return AUTOCOMPLETE_LIMIT
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise exceptions.ValidationError(
+                {self.limit_param: 'Укажите целое число больше нуля.'}
+            )
+        return limit
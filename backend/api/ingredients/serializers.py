@@ -2,8 +2,11 @@ from rest_framework import serializers
 
 from ingredients.models import Ingredient
 
+from ..metrics.serializers import SerializationMetricsMixin
 
-class IngredientSerializer(serializers.ModelSerializer):
+
+class IngredientSerializer(SerializationMetricsMixin,
+                           serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit')
@@ -1,12 +1,15 @@
 from rest_framework import viewsets
 
+from ingredients.catalog import INGREDIENTS
 from ingredients.models import Ingredient
+from ..utils.mixins import AsyncReadMixin, CatalogListMixin, ReplicaReadMixin
 from .filters import IngredientSearchFilter
 from .serializers import IngredientSerializer
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(AsyncReadMixin, ReplicaReadMixin, CatalogListMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (IngredientSearchFilter,)
-    search_fields = ('^name', 'name')
+    catalog = INGREDIENTS
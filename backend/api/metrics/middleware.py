@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from foodgram.db.queries import signature
+
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+# С какого числа одинаковых запросов за ответ писать их в лог как N+1.
+DUPLICATE_LOG_THRESHOLD = 5
+
+# Метрики обрабатываемого HTTP-запроса. sync_to_async копирует контекст в
+# поток, где выполняется код, поэтому под ASGI запросы к базе из потоков
+# view попадают в метрики своего HTTP-запроса.
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None or not metrics.sampled:
+        return execute(sql, params, many, context)
+    return metrics.record_query(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    """Обработчик connection_created: record_query ставится на
+    соединения всех потоков один раз.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetrics:
+    def __init__(self, sampled):
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.signatures = Counter()
+        self.serializing = False
+        self.serialize_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.signatures[signature(sql)] += 1
+
+    def serialize(self, to_representation, instance):
+        """Вызов to_representation верхнего сериализатора с замером.
+
+        Вложенные сериализаторы уже входят в замер внешнего. SQL-запросы,
+        выполненные при сериализации, из ее времени вычитаются, если
+        попадают в db; без выборки они остаются в serialize.
+        """
+        if self.serializing:
+            return to_representation(instance)
+        self.serializing = True
+        started = time.perf_counter()
+        db_time = self.db_time
+        try:
+            return to_representation(instance)
+        finally:
+            self.serializing = False
+            self.serialize_time += (
+                time.perf_counter() - started - (self.db_time - db_time)
+            )
+
+    def start_render(self):
+        self.render_started = time.perf_counter()
+
+    def finish_render(self, response):
+        self.render_time = time.perf_counter() - self.render_started
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.signatures.values())
+
+    def repeated(self):
+        return [
+            (sql, count) for sql, count in self.signatures.most_common()
+            if count >= DUPLICATE_LOG_THRESHOLD
+        ]
+
+    def server_timing(self):
+        def duration(seconds):
+            return f'{seconds * 1000:.1f}'
+
+        timings = [f'total;dur={duration(self.total)}']
+        if self.sampled:
+            timings.append(
+                f'db;dur={duration(self.db_time)};'
+                f'desc="{self.queries} queries, '
+                f'{self.duplicates} duplicates"'
+            )
+        timings.append(f'serialize;dur={duration(self.serialize_time)}')
+        timings.append(f'render;dur={duration(self.render_time)}')
+        app = self.total - self.serialize_time - self.render_time - (
+            self.db_time if self.sampled else 0
+        )
+        timings.append(f'app;dur={duration(app)}')
+        return ', '.join(timings)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else '<unresolved>'
+
+
+class MetricsMiddleware:
+    """Время ответа, число и время SQL-запросов по view.
+
+    SQL-запросы считает record_query только у доли запросов
+    METRICS_SAMPLE_RATE, в каком бы потоке они ни выполнялись; время
+    ответа, сериализации (SerializationMetricsMixin) и рендеринга
+    измеряется всегда. Итоги отдаются в заголовке
+    Server-Timing и в /api/metrics/, медленные запросы
+    (METRICS_SLOW_REQUEST_MS) и повторяющиеся SQL-запросы пишутся в лог.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так Django 3.2 узнает асинхронный middleware (как в
+            # MiddlewareMixin).
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        metrics = self.start(request)
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def acall(self, request):
+        metrics = self.start(request)
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def start(self, request):
+        request.metrics = RequestMetrics(
+            random.random() < settings.METRICS_SAMPLE_RATE
+        )
+        return request.metrics
+
+    def finish(self, request, response, metrics):
+        metrics.finish()
+        self.report(request, response, metrics)
+        response['Server-Timing'] = metrics.server_timing()
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответы DRF превращаются в JSON в render() уже после view.
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.start_render()
+            response.add_post_render_callback(metrics.finish_render)
+        return response
+
+    def report(self, request, response, metrics):
+        view = view_name(request)
+        slow = metrics.total * 1000 >= settings.METRICS_SLOW_REQUEST_MS
+        registry.observe(
+            view, request.method, response.status_code, metrics, slow
+        )
+        if slow:
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.0f мс, %s',
+                request.method, request.get_full_path(), view,
+                metrics.total * 1000,
+                f'SQL: {metrics.queries} за {metrics.db_time * 1000:.0f} мс'
+                if metrics.sampled else 'SQL не измерялся'
+            )
+        for sql, count in metrics.repeated():
+            logger.warning(
+                'Запрос повторен %d раз в %s %s (%s): %s',
+                count, request.method, request.path, view, sql
+            )
@@ -0,0 +1,182 @@
+from collections import Counter, defaultdict
+from threading import Lock
+
+from foodgram.db.pool import pool_stats
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n'
+    )
+
+
+def labels(**values):
+    return '{' + ','.join(
+        f'{name}="{escape(value)}"' for name, value in values.items()
+    ) + '}'
+
+
+class MetricsRegistry:
+    """Метрики запросов процесса в текстовом формате Prometheus.
+
+    Значения копятся в памяти процесса: у каждого воркера свои, как у
+    обычного клиента Prometheus без общего хранилища. Число запросов и
+    время ответа считаются для всех запросов, SQL-метрики - только для
+    попавших в выборку (sampled_requests_total).
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = Counter()
+            self.slow = Counter()
+            self.buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+            self.duration_sum = Counter()
+            self.duration_count = Counter()
+            self.serialize_seconds = Counter()
+            self.render_seconds = Counter()
+            self.sampled = Counter()
+            self.queries = Counter()
+            self.duplicates = Counter()
+            self.db_seconds = Counter()
+
+    def observe(self, view, method, status, metrics, slow=False):
+        with self.lock:
+            self.requests[view, method, status] += 1
+            if slow:
+                self.slow[view] += 1
+            buckets = self.buckets[view]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if metrics.total <= bound:
+                    buckets[index] += 1
+            self.duration_sum[view] += metrics.total
+            self.duration_count[view] += 1
+            self.serialize_seconds[view] += metrics.serialize_time
+            self.render_seconds[view] += metrics.render_time
+            if metrics.sampled:
+                self.sampled[view] += 1
+                self.queries[view] += metrics.queries
+                self.duplicates[view] += metrics.duplicates
+                self.db_seconds[view] += metrics.db_time
+
+    def counter(self, name, help_text, values, label_names=('view',)):
+        return self.series('counter', name, help_text, values, label_names)
+
+    def gauge(self, name, help_text, values, label_names=('view',)):
+        return self.series('gauge', name, help_text, values, label_names)
+
+    def series(self, kind, name, help_text, values, label_names):
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for key, value in sorted(values.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(
+                f'{name}{labels(**dict(zip(label_names, key)))} {value}'
+            )
+        return lines
+
+    def histogram(self):
+        name = 'foodgram_request_duration_seconds'
+        lines = [
+            f'# HELP {name} Время ответа.',
+            f'# TYPE {name} histogram',
+        ]
+        for view, buckets in sorted(self.buckets.items()):
+            for bound, count in zip(DURATION_BUCKETS, buckets):
+                lines.append(
+                    f'{name}_bucket{labels(view=view, le=bound)} {count}'
+                )
+            lines += [
+                f'{name}_bucket{labels(view=view, le="+Inf")} '
+                f'{self.duration_count[view]}',
+                f'{name}_sum{labels(view=view)} {self.duration_sum[view]}',
+                f'{name}_count{labels(view=view)} '
+                f'{self.duration_count[view]}',
+            ]
+        return lines
+
+    def pools(self):
+        stats = pool_stats()
+        if not stats:
+            return []
+
+        def values(key):
+            return {pool: state[key] for pool, state in stats.items()}
+
+        gauges = (
+            ('max_size', 'Предельный размер пула соединений.'),
+            ('size', 'Открытые соединения пула.'),
+            ('in_use', 'Занятые соединения пула.'),
+            ('in_use_peak', 'Наибольшее число занятых соединений.'),
+            ('waiting', 'Потоки, ждущие соединения.'),
+        )
+        counters = (
+            ('checkouts', 'Выдачи соединений из пула.'),
+            ('waits', 'Выдачи, которым пришлось ждать.'),
+            ('timeouts', 'Отказы по истечении DB_POOL_TIMEOUT.'),
+            ('wait_seconds', 'Время ожидания соединений.'),
+        )
+        lines = []
+        for key, help_text in gauges:
+            lines += self.gauge(
+                f'foodgram_db_pool_{key}', help_text, values(key),
+                ('alias', 'database')
+            )
+        for key, help_text in counters:
+            lines += self.counter(
+                f'foodgram_db_pool_{key}_total', help_text, values(key),
+                ('alias', 'database')
+            )
+        return lines
+
+    def render(self):
+        pools = self.pools()
+        with self.lock:
+            lines = [
+                *self.counter(
+                    'foodgram_requests_total', 'Обработанные запросы.',
+                    self.requests, ('view', 'method', 'status')
+                ),
+                *self.counter(
+                    'foodgram_slow_requests_total', 'Медленные запросы.',
+                    self.slow
+                ),
+                *self.histogram(),
+                *self.counter(
+                    'foodgram_serialize_seconds_total',
+                    'Время сериализации объектов в данные ответа.',
+                    self.serialize_seconds
+                ),
+                *self.counter(
+                    'foodgram_render_seconds_total',
+                    'Время рендеринга ответа в JSON.', self.render_seconds
+                ),
+                *self.counter(
+                    'foodgram_sampled_requests_total',
+                    'Запросы, для которых считались SQL-метрики.',
+                    self.sampled
+                ),
+                *self.counter(
+                    'foodgram_db_queries_total', 'SQL-запросы.', self.queries
+                ),
+                *self.counter(
+                    'foodgram_db_duplicate_queries_total',
+                    'Повторы SQL-запросов с той же сигнатурой.',
+                    self.duplicates
+                ),
+                *self.counter(
+                    'foodgram_db_seconds_total', 'Время SQL-запросов.',
+                    self.db_seconds
+                ),
+                *pools,
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,16 @@
+from .middleware import current_metrics
+
+
+class SerializationMetricsMixin:
+    """Время сериализации в метриках запроса.
+
+    Подмешивается к сериализаторам, которые отдаются в ответах. С many=True
+    замеряется каждый элемент списка, вложенные сериализаторы входят в
+    замер внешнего.
+    """
+
+    def to_representation(self, instance):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return super().to_representation(instance)
+        return metrics.serialize(super().to_representation, instance)
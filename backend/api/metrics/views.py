@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from .registry import registry
+
+
+def metrics(request):
+    """Метрики процесса для Prometheus.
+
+    Нужен заголовок Authorization: Bearer <METRICS_TOKEN>; без
+    METRICS_TOKEN метрики закрыты. Проверка по адресу не подходит: за
+    nginx все запросы приходят с внутреннего адреса.
+    """
+    token = settings.METRICS_TOKEN
+    if not token or not constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
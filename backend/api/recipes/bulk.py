@@ -0,0 +1,173 @@
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from rest_framework.parsers import BaseParser
+
+from ingredients.models import Ingredient
+from recipes.images import schedule_thumbnails
+from recipes.models import AmountIngredient, Recipe, change_counters
+from recipes.search import update_search_index
+from tags.models import Tag
+
+from ..utils.cache import RECIPES_KEY, author_recipes_key, bump_on_commit
+from .serializers import BulkRecipeSerializer
+
+IMPORT_BATCH_SIZE = 200
+EXPORT_BATCH_SIZE = 500
+
+User = get_user_model()
+
+
+class NDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return iter(())
+        return (line.decode('utf-8') for line in stream)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def validate_line(number, line):
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None, {'line': number, 'errors': 'Некорректный JSON.'}
+    serializer = BulkRecipeSerializer(data=data)
+    if not serializer.is_valid():
+        return None, {'line': number, 'errors': serializer.errors}
+    return serializer.validated_data, None
+
+
+def check_references(valid):
+    tags = set(Tag.objects.filter(
+        id__in={tag for _, data in valid for tag in data['tags']}
+    ).values_list('id', flat=True))
+    ingredients = set(Ingredient.objects.filter(
+        id__in={
+            item['id'] for _, data in valid for item in data['ingredients']
+        }
+    ).values_list('id', flat=True))
+    checked, errors = [], []
+    for number, data in valid:
+        missing_tags = set(data['tags']) - tags
+        missing_ingredients = {
+            item['id'] for item in data['ingredients']
+        } - ingredients
+        line_errors = {
+            field: [message.format(', '.join(map(str, sorted(missing))))]
+            for field, message, missing in (
+                ('tags', 'Теги не найдены: {}.', missing_tags),
+                ('ingredients', 'Ингредиенты не найдены: {}.',
+                 missing_ingredients),
+            )
+            if missing
+        }
+        if line_errors:
+            errors.append({'line': number, 'errors': line_errors})
+        else:
+            checked.append((number, data))
+    return checked, errors
+
+
+@transaction.atomic
+def create_recipes(author, valid):
+    recipes = [
+        Recipe(
+            author=author,
+            ingredients_count=len(data['ingredients']),
+            **{
+                field: value for field, value in data.items()
+                if field not in ('tags', 'ingredients')
+            }
+        )
+        for _, data in valid
+    ]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes)
+    else:
+        for recipe in recipes:
+            recipe.save()
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag)
+        for recipe, (_, data) in zip(recipes, valid)
+        for tag in set(data['tags'])
+    )
+    AmountIngredient.objects.bulk_create(
+        AmountIngredient(
+            recipe=recipe, ingredient_id=item['id'], amount=item['amount']
+        )
+        for recipe, (_, data) in zip(recipes, valid)
+        for item in data['ingredients']
+    )
+    change_counters(
+        User.objects.filter(pk=author.pk), recipes_count=len(recipes)
+    )
+    update_search_index(recipe.id for recipe in recipes)
+    bump_on_commit(RECIPES_KEY, author_recipes_key(author.pk))
+    for name in {recipe.image.name for recipe in recipes}:
+        schedule_thumbnails(name)
+    return recipes
+
+
+def import_recipes(lines, author, batch_size=IMPORT_BATCH_SIZE):
+    for batch in batched(enumerate(lines, 1), batch_size):
+        valid, results = [], []
+        for number, line in batch:
+            if not line.strip():
+                continue
+            data, error = validate_line(number, line)
+            if error:
+                results.append(error)
+            else:
+                valid.append((number, data))
+        valid, errors = check_references(valid)
+        results.extend(errors)
+        if valid:
+            recipes = create_recipes(author, valid)
+            results.extend(
+                {'line': number, 'id': recipe.id}
+                for recipe, (number, _) in zip(recipes, valid)
+            )
+        yield from sorted(results, key=lambda result: result['line'])
+
+
+def export_recipes(request, batch_size=EXPORT_BATCH_SIZE):
+    last_id = 0
+    while True:
+        recipes = list(
+            Recipe.objects.filter(id__gt=last_id).order_by('id')
+            .prefetch_related('tags', 'amount_ingredients')[:batch_size]
+        )
+        if not recipes:
+            return
+        yield ''.join(
+            json.dumps(
+                {
+                    'id': recipe.id,
+                    'author': recipe.author_id,
+                    'tags': [tag.id for tag in recipe.tags.all()],
+                    'ingredients': [
+                        {'id': item.ingredient_id, 'amount': item.amount}
+                        for item in recipe.amount_ingredients.all()
+                    ],
+                    'name': recipe.name,
+                    'image': request.build_absolute_uri(recipe.image.url),
+                    'text': recipe.text,
+                    'cooking_time': recipe.cooking_time,
+                    'pub_date': recipe.pub_date.isoformat(),
+                },
+                ensure_ascii=False
+            ) + '\n'
+            for recipe in recipes
+        )
+        last_id = recipes[-1].id
@@ -0,0 +1,117 @@
+import heapq
+import math
+from itertools import islice
+
+from django.core.cache import caches
+from django.db.models import Q
+
+from recipes.models import Recipe
+from users.models import Follow
+
+from ..utils.cache import (RESPONSE_CACHE_ALIAS, author_recipes_key,
+                           follows_key, get_tokens)
+
+FEED_ORDERING = ('-pub_date', '-id')
+
+
+def position_of(recipe):
+    return recipe.pub_date, recipe.id
+
+
+class Feed:
+    """Рецепты авторов, на которых подписан user, от новых к старым.
+
+    Лента собирается слиянием списков последних рецептов каждого автора
+    (индекс по author, pub_date), а не соединением подписок со всей
+    таблицей рецептов. Голова ленты - позиции (pub_date, id) первых
+    head_size рецептов - кэшируется для пользователя и устаревает при
+    подписке, отписке и появлении или удалении рецепта у любого из
+    авторов.
+    """
+
+    head_size = 100
+    min_step = 5
+
+    def __init__(self, user):
+        self.user = user
+
+    @property
+    def store(self):
+        return caches[RESPONSE_CACHE_ALIAS]
+
+    def merge(self, queryset, authors, limit):
+        """Позиции limit самых новых рецептов authors из queryset.
+
+        Сначала у каждого автора читается небольшая доля limit. Авторы,
+        у которых прочитанное кончилось раньше отсечки слияния,
+        дочитываются с удвоенным лимитом, пока каждый из них либо не
+        закончится, либо не уйдет за отсечку: лента обычно собирается из
+        нескольких последних рецептов каждого автора, а не из limit
+        рецептов на автора.
+        """
+        if not authors:
+            return []
+        queryset = queryset.only('id', 'author_id', 'pub_date')
+        fetched = {author: [] for author in authors}
+        step = min(limit, max(
+            self.min_step, 2 * math.ceil(limit / len(fetched))
+        ))
+        pending = list(fetched)
+        while pending:
+            latest = queryset.latest_by_author(pending, step)
+            for author, recipes in latest.items():
+                fetched[author] = [position_of(recipe) for recipe in recipes]
+            merged = list(islice(
+                heapq.merge(*fetched.values(), reverse=True), limit
+            ))
+            cutoff = merged[-1] if len(merged) == limit else None
+            pending = [
+                author for author in pending
+                if len(fetched[author]) == step and step < limit and (
+                    cutoff is None or fetched[author][-1] > cutoff
+                )
+            ]
+            step = min(limit, step * 2)
+        return merged
+
+    def head(self):
+        key = f'feed:head:{self.user.pk}'
+        entry = self.store.get(key)
+        if entry is not None and get_tokens(entry['tokens']) == (
+            entry['tokens']
+        ):
+            return entry['authors'], entry['head']
+        tokens = get_tokens([follows_key(self.user.pk)])
+        authors = list(Follow.objects.filter(user=self.user).values_list(
+            'author_id', flat=True
+        ))
+        tokens.update(get_tokens(map(author_recipes_key, authors)))
+        head = self.merge(Recipe.objects.all(), authors, self.head_size)
+        self.store.set(key, {
+            'tokens': tokens, 'authors': authors, 'head': head
+        })
+        return authors, head
+
+    def positions(self, position, limit):
+        authors, head = self.head()
+        found = head
+        if position is not None:
+            found = [entry for entry in head if entry < position]
+        if len(found) >= limit or len(head) < self.head_size:
+            # В голове хватает рецептов, либо в ней вся лента.
+            return found[:limit]
+        queryset = Recipe.objects.all()
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+            )
+        return self.merge(queryset, authors, limit)
+
+    def fetch(self, position, limit):
+        """Не больше limit рецептов ленты строго после позиции position."""
+        if position is not None:
+            position = tuple(position)
+        ids = [pk for _, pk in self.positions(position, limit)]
+        recipes = Recipe.objects.with_user_data(self.user).in_bulk(ids)
+        return [recipes[pk] for pk in ids if pk in recipes]
@@ -0,0 +1,104 @@
+import binascii
+import hashlib
+import re
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+from recipes.images import thumbnail_urls
+
+WHITESPACE = re.compile(r'\s+')
+
+
+class HashedBase64ImageField(Base64ImageField):
+    """Base64ImageField, декодирующий картинку по частям во временный файл.
+
+    Файл называется по sha256 содержимого, поэтому повторно загруженная
+    картинка не сохраняется второй раз, а проверка Pillow и сохранение
+    работают с файлом на диске, а не с копиями в памяти.
+    """
+
+    chunk_size = 4 * 64 * 1024
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(base64_data, str):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        header, _, encoded = base64_data.rpartition(';base64,')
+        if WHITESPACE.search(encoded):
+            encoded = WHITESPACE.sub('', encoded)
+        file = TemporaryUploadedFile(
+            'image', header.replace('data:', '') or None, 0, None
+        )
+        try:
+            digest = self.decode(encoded, file)
+            file.name = f'{digest}.{self.detect_extension(file)}'
+        except Exception:
+            file.close()
+            raise
+        return serializers.ImageField.to_internal_value(self, file)
+
+    def decode(self, encoded, file):
+        sha256 = hashlib.sha256()
+        try:
+            for start in range(0, len(encoded), self.chunk_size):
+                chunk = binascii.a2b_base64(
+                    encoded[start:start + self.chunk_size]
+                )
+                sha256.update(chunk)
+                file.write(chunk)
+        except (binascii.Error, ValueError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        file.size = file.tell()
+        file.seek(0)
+        return sha256.hexdigest()
+
+    def detect_extension(self, file):
+        try:
+            with Image.open(file.temporary_file_path()) as image:
+                extension = image.format.lower()
+        except OSError:
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        extension = 'jpg' if extension == 'jpeg' else extension
+        if extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        return extension
+
+
+def absolute_url(request, url):
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+class ThumbnailsField(serializers.ReadOnlyField):
+    """{размер: url} готовых миниатюр картинки рецепта."""
+
+    def __init__(self, **kwargs):
+        super().__init__(source='*', **kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.has_thumbnails:
+            return {}
+        request = self.context.get('request')
+        return {
+            size: absolute_url(request, url)
+            for size, url in thumbnail_urls(recipe.image.name).items()
+        }
+
+
+class ThumbnailImageField(serializers.ReadOnlyField):
+    """Миниатюра нужного размера, пока ее нет - оригинал."""
+
+    def __init__(self, size, **kwargs):
+        self.size = size
+        super().__init__(source='*', **kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        url = recipe.image.url
+        if recipe.has_thumbnails:
+            url = thumbnail_urls(recipe.image.name, [self.size])[self.size]
+        return absolute_url(self.context.get('request'), url)
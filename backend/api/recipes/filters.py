@@ -1,35 +1,96 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.filters import OrderingFilter
 
 from recipes.models import Recipe
-from tags.models import Tag
+from recipes.search import search_recipes
+from tags.catalog import tag_ids_by_slug
 
 User = get_user_model()
 
 
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
+def tag_choices():
+    return [(slug, slug) for slug in tag_ids_by_slug()]
+
+
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    # Слаги проверяются по справочнику тегов в памяти, а рецепты
+    # отбираются через EXISTS по таблице связи: соединение с тегами
+    # размножало бы рецепты с несколькими подходящими тегами.
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
     )
 
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
+    have = NumberInFilter(method='filter_have')
+    max_missing = filters.NumberFilter(
+        method='filter_max_missing', min_value=0, decimal_places=0
+    )
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author',)
 
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        ids = tag_ids_by_slug()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'),
+            tag_id__in=[ids[slug] for slug in value if slug in ids],
+        )))
+
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(favorite_recipes__user=user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(shopping_list_recipes__user=user)
+            return queryset.filter(is_in_shopping_cart=True)
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
+
+    def filter_have(self, queryset, name, value):
+        if not value:
+            return queryset
+        max_missing = self.form.cleaned_data.get('max_missing')
+        return queryset.with_ingredients_from(
+            set(map(int, value)),
+            None if max_missing is None else int(max_missing)
+        )
+
+    def filter_max_missing(self, queryset, name, value):
+        # Учитывается в filter_have, без ?have= не применяется.
         return queryset
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """При ?search= и ?have= без явного ?ordering= сохраняет порядок,
+    заданный фильтром: по релевантности и по недостающим ингредиентам.
+    """
+
+    filter_orderings = ('search', 'have')
+
+    def get_default_ordering(self, view):
+        if any(
+            view.request.query_params.get(param, '').strip()
+            for param in self.filter_orderings
+        ):
+            return None
+        return super().get_default_ordering(view)
@@ -0,0 +1,94 @@
+import csv
+import json
+
+from rest_framework import renderers
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(renderers.BaseRenderer):
+    charset = 'utf-8'
+    chunk_size = 500
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Список покупок отдается потоком через stream(),
+        # render() нужен только для ответов с ошибками.
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+    def stream(self, rows):
+        chunk = [self.header()]
+        for index, row in enumerate(rows):
+            chunk.append(self.format_row(index, *row))
+            if len(chunk) >= self.chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+        chunk.append(self.footer())
+        yield ''.join(chunk)
+
+    def header(self):
+        return ''
+
+    def footer(self):
+        return ''
+
+    def format_row(self, index, name, measurement_unit, amount):
+        raise NotImplementedError
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def header(self):
+        return 'Список покупок: \n'
+
+    def format_row(self, index, name, measurement_unit, amount):
+        return f'{name}, {amount} {measurement_unit}\n'
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def __init__(self):
+        self.writer = csv.writer(Echo())
+
+    def header(self):
+        return self.writer.writerow(
+            ('Ингредиент', 'Количество', 'Единицы измерения')
+        )
+
+    def format_row(self, index, name, measurement_unit, amount):
+        return self.writer.writerow((name, amount, measurement_unit))
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def header(self):
+        return '['
+
+    def footer(self):
+        return ']'
+
+    def format_row(self, index, name, measurement_unit, amount):
+        item = json.dumps(
+            {
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount,
+            },
+            ensure_ascii=False
+        )
+        return item if index == 0 else f',{item}'
+
+
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+)
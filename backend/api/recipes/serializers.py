@@ -1,14 +1,23 @@
+from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.shortcuts import get_object_or_404
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 from rest_framework import exceptions, serializers
 
+from ingredients.catalog import INGREDIENTS
 from ingredients.models import Ingredient
-from recipes.models import AmountIngredient, Recipe
+from recipes.images import schedule_thumbnails
+from recipes.models import (AmountIngredient, Recipe, ShoppingListIngredient,
+                            amount_deltas, change_counters)
+from recipes.search import update_search_index
+from tags.catalog import TAGS
 from tags.models import Tag
 
+from ..metrics.serializers import SerializationMetricsMixin
 from ..tags.serializers import TagSerializer
 from ..users.serializers import CustomUserSerializer
+from .fields import HashedBase64ImageField, ThumbnailsField
+
+User = get_user_model()
 
 
 class AmountIngredientSerializer(serializers.ModelSerializer):
@@ -28,57 +37,79 @@ class AmountIngredientSerializer(serializers.ModelSerializer):
 
 
 class FullAmountIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.IntegerField(source='ingredient.id')
-    name = serializers.CharField(source='ingredient.name')
-    measurement_unit = serializers.CharField(
-        source='ingredient.measurement_unit'
-    )
+    id = serializers.IntegerField(source='ingredient_id')
+    name = serializers.SerializerMethodField()
+    measurement_unit = serializers.SerializerMethodField()
 
     class Meta:
         model = AmountIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
+    def get_name(self, obj):
+        return INGREDIENTS.instance(obj.ingredient_id).name
+
+    def get_measurement_unit(self, obj):
+        return INGREDIENTS.instance(obj.ingredient_id).measurement_unit
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class RecipeSerializer(SerializationMetricsMixin,
+                       serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     ingredients = serializers.SerializerMethodField()
-    image = Base64ImageField()
+    image = HashedBase64ImageField()
+    thumbnails = ThumbnailsField()
     author = CustomUserSerializer(read_only=True)
-    tags = TagSerializer(read_only=True, many=True)
+    tags = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart', 'name',
-            'image', 'text', 'cooking_time'
+            'image', 'thumbnails', 'text', 'cooking_time'
         )
 
+    def get_tags(self, obj):
+        return TagSerializer(
+            [TAGS.instance(tag.pk) for tag in obj.tags.all()], many=True
+        ).data
+
     def get_ingredients(self, obj):
-        ingredients = AmountIngredient.objects.filter(recipe=obj)
-        serializer = FullAmountIngredientSerializer(ingredients, many=True)
+        serializer = FullAmountIngredientSerializer(
+            sorted(
+                obj.amount_ingredients.all(),
+                key=lambda item: INGREDIENTS.instance(item.ingredient_id).name
+            ),
+            many=True
+        )
         return serializer.data
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # В списках картинка заменяется миниатюрой, как в кратком рецепте.
+        size = self.context.get('image_size')
+        if size in data['thumbnails']:
+            data['image'] = data['thumbnails'][size]
+        return data
+
     def get_is_favorited(self, obj):
-        if (
-            self.context['request'].user.is_authenticated
-            and obj.favorite_recipes.filter(
-                user=self.context['request'].user
-            ).exists()
-        ):
-            return True
-        return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        user = self.context['request'].user
+        return (
+            user.is_authenticated
+            and obj.favorite_recipes.filter(user=user).exists()
+        )
 
     def get_is_in_shopping_cart(self, obj):
-        if (
-            self.context['request'].user.is_authenticated
-            and obj.shopping_list_recipes.filter(
-                user=self.context['request'].user
-            ).exists()
-        ):
-            return True
-        return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        user = self.context['request'].user
+        return (
+            user.is_authenticated
+            and obj.shopping_list_recipes.filter(user=user).exists()
+        )
 
 
 class CreateAndUpdateRecipeSerializer(RecipeSerializer):
@@ -112,37 +143,53 @@ class CreateAndUpdateRecipeSerializer(RecipeSerializer):
         return value
 
     def validate_ingredients(self, value):
+        ingredients = self.get_unique_ingredients(value)
+        missing = set(ingredients) - Ingredient.objects.in_bulk(
+            ingredients
+        ).keys()
+        if missing:
+            raise exceptions.ValidationError(
+                'Ингредиенты не найдены: '
+                f'{", ".join(map(str, sorted(missing)))}.'
+            )
+        return value
+
+    def get_unique_ingredients(self, value):
         if not value:
             raise exceptions.ValidationError(
                 'Нужно добавить хотя бы один ингредиент.'
             )
         ingredients = [item['id'] for item in value]
-        for ingredient in ingredients:
-            if ingredients.count(ingredient) > 1:
-                raise exceptions.ValidationError(
-                    'У рецепта не может быть два одинаковых ингредиента.'
-                )
-        return value
+        if len(set(ingredients)) != len(ingredients):
+            raise exceptions.ValidationError(
+                'У рецепта не может быть два одинаковых ингредиента.'
+            )
+        return ingredients
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
 
-        recipe = Recipe.objects.create(author=author, **validated_data)
+        recipe = Recipe.objects.create(
+            author=author, ingredients_count=len(ingredients), **validated_data
+        )
+        schedule_thumbnails(recipe.image.name)
+        change_counters(User.objects.filter(pk=author.pk), recipes_count=1)
         recipe.tags.set(tags)
-
-        for ingredient in ingredients:
-            amount = ingredient['amount']
-            ingredient = get_object_or_404(Ingredient, pk=ingredient['id'])
-
-            AmountIngredient.objects.create(
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
                 recipe=recipe,
-                ingredient=ingredient,
-                amount=amount
+                ingredient_id=ingredient['id'],
+                amount=ingredient['amount']
             )
+            for ingredient in ingredients
+        )
+        update_search_index([recipe.id])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
         if tags is not None:
@@ -150,18 +197,48 @@ class CreateAndUpdateRecipeSerializer(RecipeSerializer):
 
         ingredients = validated_data.pop('ingredients', None)
         if ingredients is not None:
-            instance.ingredients.clear()
+            ShoppingListIngredient.objects.change_recipe(
+                instance, self.update_ingredients(instance, ingredients)
+            )
+            instance.ingredients_count = len(ingredients)
+        if 'image' in validated_data:
+            instance.has_thumbnails = False
+        recipe = super().update(instance, validated_data)
+        if 'image' in validated_data:
+            schedule_thumbnails(recipe.image.name)
+        update_search_index([recipe.id])
+        return recipe
 
-            for ingredient in ingredients:
-                amount = ingredient['amount']
-                ingredient = get_object_or_404(Ingredient, pk=ingredient['id'])
+    def update_ingredients(self, recipe, ingredients):
+        current = {
+            item.ingredient_id: item
+            for item in AmountIngredient.objects.filter(recipe=recipe)
+        }
+        old_amounts = {
+            ingredient: item.amount for ingredient, item in current.items()
+        }
+        new_amounts = {item['id']: item['amount'] for item in ingredients}
 
-                AmountIngredient.objects.update_or_create(
-                    recipe=instance,
-                    ingredient=ingredient,
-                    defaults={'amount': amount}
-                )
-        return super().update(instance, validated_data)
+        removed = current.keys() - new_amounts.keys()
+        if removed:
+            AmountIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient, item in current.items():
+            amount = new_amounts.get(ingredient, item.amount)
+            if amount != item.amount:
+                item.amount = amount
+                changed.append(item)
+        AmountIngredient.objects.bulk_update(changed, ('amount',))
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
+                recipe=recipe, ingredient_id=ingredient, amount=amount
+            )
+            for ingredient, amount in new_amounts.items()
+            if ingredient not in current
+        )
+        return amount_deltas(old_amounts, new_amounts)
 
     def to_representation(self, instance):
         serializer = RecipeSerializer(
@@ -169,3 +246,40 @@ class CreateAndUpdateRecipeSerializer(RecipeSerializer):
             context={'request': self.context.get('request')}
         )
         return serializer.data
+
+
+class BulkRecipeSerializer(CreateAndUpdateRecipeSerializer):
+    tags = serializers.ListField(child=serializers.IntegerField())
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'tags', 'ingredients', 'name', 'image', 'text', 'cooking_time'
+        )
+
+    def validate_ingredients(self, value):
+        # Существование ингредиентов и тегов проверяется сразу для всей
+        # пачки рецептов при импорте.
+        self.get_unique_ingredients(value)
+        return value
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+    def validate_ids(self, value):
+        ids = list(dict.fromkeys(value))
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'has_thumbnails', 'cooking_time'
+        ).in_bulk(ids)
+        missing = set(ids) - recipes.keys()
+        if missing:
+            raise exceptions.ValidationError(
+                'Рецепты не найдены: '
+                f'{", ".join(map(str, sorted(missing)))}.'
+            )
+        return [recipes[pk] for pk in ids]
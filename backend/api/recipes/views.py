@@ -1,43 +1,183 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import Sum
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import exceptions, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from ingredients.models import Ingredient
-from recipes.models import (AmountIngredient, FavoriteRecipe, Recipe,
-                            ShoppingList)
+from ingredients.catalog import INGREDIENTS
+from recipes.models import (FavoriteRecipe, Recipe, ShoppingList,
+                            ShoppingListIngredient, change_counters)
+from recipes.search import delete_from_search_index
+from tags.catalog import TAGS
+
 from ..users.serializers import ShortRecipeSerializer
-from ..utils.paginators import PageLimitPaginator
-from .filters import RecipeFilter
-from .serializers import CreateAndUpdateRecipeSerializer, RecipeSerializer
+from ..utils.cache import (RECIPE_COUNTERS_KEY, RECIPES_KEY, ResponseCache,
+                           bump_on_commit, get_tokens, recipe_key, user_key)
+from ..utils.mixins import AsyncReadMixin, ReplicaReadMixin
+from ..utils.paginators import KeysetPaginator, PageLimitPaginator
+from ..utils.toggles import (create_link, create_links, delete_link,
+                             delete_links)
+from .bulk import NDJSONParser, export_recipes, import_recipes
+from .feed import FEED_ORDERING, Feed
+from .filters import RecipeFilter, RecipeOrderingFilter
+from .renderers import SHOPPING_LIST_RENDERERS
+from .serializers import (CreateAndUpdateRecipeSerializer, RecipeIdsSerializer,
+                          RecipeSerializer)
+
+User = get_user_model()
+
+RECIPE_LIST_CACHE = ResponseCache('recipe-list')
+RECIPE_DETAIL_CACHE = ResponseCache('recipe-detail')
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AsyncReadMixin, ReplicaReadMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     pagination_class = PageLimitPaginator
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ('pub_date', 'favorites_count', 'shopping_carts_count')
+    ordering = ('-pub_date', '-id')
+    async_read_actions = (
+        'list', 'retrieve', 'feed', 'download_shopping_cart'
+    )
+
+    def get_queryset(self):
+        return Recipe.objects.with_user_data(self.request.user)
+
+    @property
+    def cursor_ordering(self):
+        # Релевантность поиска и число недостающих ингредиентов не годятся
+        # для курсора: при ?search= и ?have= курсор идет по порядку по
+        # умолчанию.
+        ordering = RecipeOrderingFilter().get_ordering(
+            self.request, self.queryset, self
+        ) or self.ordering
+        if 'id' not in {field.lstrip('-') for field in ordering}:
+            descending = ordering[0].startswith('-')
+            ordering = (*ordering, '-id' if descending else 'id')
+        return ordering
+
+    def catalog_tokens(self):
+        return {
+            TAGS.version_key: TAGS.version,
+            INGREDIENTS.version_key: INGREDIENTS.version,
+        }
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        keys = [RECIPES_KEY]
+        if 'ordering' in request.query_params:
+            # Порядок по счетчикам меняется без изменения самих рецептов.
+            keys.append(RECIPE_COUNTERS_KEY)
+        return RECIPE_LIST_CACHE.fetch(
+            request,
+            lambda: super(RecipeViewSet, self).list(request, *args, **kwargs),
+            tokens={**get_tokens(keys), **self.catalog_tokens()},
+            dependencies=lambda data: {
+                user_key(recipe['author']['id'])
+                for recipe in data['results']
+            },
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().retrieve(request, *args, **kwargs)
+        return RECIPE_DETAIL_CACHE.fetch(
+            request,
+            lambda: super(RecipeViewSet, self).retrieve(
+                request, *args, **kwargs
+            ),
+            tokens={
+                **get_tokens([recipe_key(kwargs['pk'])]),
+                **self.catalog_tokens(),
+            },
+            dependencies=lambda data: [user_key(data['author']['id'])],
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'feed'):
+            context['image_size'] = 'medium'
+        return context
 
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'partial_update':
             return CreateAndUpdateRecipeSerializer
         return RecipeSerializer
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        change_counters(
+            User.objects.filter(pk=instance.author_id), recipes_count=-1
+        )
+        delete_from_search_index([instance.pk])
+        instance.delete()
+
+    @action(
+        detail=False,
+        methods=['POST'],
+        permission_classes=(permissions.IsAuthenticated,),
+        parser_classes=(NDJSONParser,),
+    )
+    def bulk(self, request):
+        results = list(import_recipes(request.data, request.user))
+        created = sum('id' in result for result in results)
+        return Response({
+            'created': created,
+            'failed': len(results) - created,
+            'results': results,
+        })
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def export(self, request):
+        return StreamingHttpResponse(
+            export_recipes(request),
+            content_type='application/x-ndjson; charset=utf-8'
+        )
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def feed(self, request):
+        paginator = KeysetPaginator(
+            FEED_ORDERING, self.paginator.get_page_size(request)
+        )
+        page = paginator.paginate(request, Recipe, Feed(request.user).fetch)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    def change_recipe_counters(self, ids, **deltas):
+        if ids:
+            change_counters(Recipe.objects.filter(pk__in=ids), **deltas)
+            bump_on_commit(RECIPE_COUNTERS_KEY)
+
     @action(detail=True, methods=['POST'])
     def favorite(self, request, pk=None):
-        user = self.request.user
         recipe = get_object_or_404(Recipe, pk=pk)
-        if FavoriteRecipe.objects.filter(
-                user=user,
-                recipe=recipe
-        ).exists():
+        with transaction.atomic():
+            self.lock_user(request.user)
+            created = create_link(
+                FavoriteRecipe,
+                lambda: self.change_recipe_counters([pk], favorites_count=1),
+                user=request.user,
+                recipe=recipe,
+            )
+        if not created:
             raise exceptions.ValidationError('Рецепт уже в избранном.')
-        FavoriteRecipe.objects.create(user=user, recipe=recipe)
         serializer = ShortRecipeSerializer(
             recipe,
             context={'request': request}
@@ -46,32 +186,38 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @favorite.mapping.delete
     def delete_favorite(self, request, pk=None):
-        user = self.request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        if not FavoriteRecipe.objects.filter(
-                user=user,
-                recipe=recipe
-        ).exists():
+        with transaction.atomic():
+            self.lock_user(request.user)
+            deleted = delete_link(
+                FavoriteRecipe,
+                Recipe.objects.filter(pk=pk).exists,
+                lambda: self.change_recipe_counters([pk], favorites_count=-1),
+                user=request.user,
+                recipe_id=pk,
+            )
+        if not deleted:
             raise exceptions.ValidationError(
                 'Рецепта нет в избранном, либо он уже удален.'
             )
-        favorite = get_object_or_404(FavoriteRecipe,
-                                     user=user, recipe=recipe)
-        favorite.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['POST'])
     def shopping_cart(self, request, pk=None):
-        user = self.request.user
+        user = request.user
         recipe = get_object_or_404(Recipe, pk=pk)
-        if ShoppingList.objects.filter(
-                user=user,
-                recipe=recipe
-        ).exists():
+
+        def added():
+            ShoppingListIngredient.objects.add_recipe(user, recipe)
+            self.change_recipe_counters([pk], shopping_carts_count=1)
+
+        with transaction.atomic():
+            self.lock_user(user)
+            created = create_link(ShoppingList, added, user=user,
+                                  recipe=recipe)
+        if not created:
             raise exceptions.ValidationError(
                 'Рецепт уже в списке покупок.'
             )
-        ShoppingList.objects.create(user=user, recipe=recipe)
         serializer = ShortRecipeSerializer(
             recipe,
             context={'request': request}
@@ -80,48 +226,135 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk=None):
-        user = self.request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        if not ShoppingList.objects.filter(
+        user = request.user
+
+        def removed():
+            ShoppingListIngredient.objects.remove_recipe(user, pk)
+            self.change_recipe_counters([pk], shopping_carts_count=-1)
+
+        with transaction.atomic():
+            self.lock_user(user)
+            deleted = delete_link(
+                ShoppingList,
+                Recipe.objects.filter(pk=pk).exists,
+                removed,
                 user=user,
-                recipe=recipe
-        ).exists():
+                recipe_id=pk,
+            )
+        if not deleted:
             raise exceptions.ValidationError(
                 'Рецепта нет в списке покупок, либо он уже удален.'
             )
-        shopping_cart = get_object_or_404(
-            ShoppingList,
-            user=user,
-            recipe=recipe
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def get_batch_recipes(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['ids']
+
+    def lock_user(self, user):
+        # Изменения избранного и корзины одного пользователя, одиночные
+        # и пакетные, выполняются по очереди: пакетные запросы находят
+        # созданные и удаленные связи чтением перед записью.
+        list(User.objects.select_for_update().filter(
+            pk=user.pk
+        ).values_list('pk'))
+
+    @action(
+        detail=False,
+        methods=['POST'],
+        url_path='favorite',
+        url_name='favorite-batch',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def favorite_batch(self, request):
+        recipes = self.get_batch_recipes(request)
+        with transaction.atomic():
+            self.lock_user(request.user)
+            created = create_links(
+                FavoriteRecipe, 'recipe_id', [recipe.id for recipe in recipes],
+                user=request.user
+            )
+            self.change_recipe_counters(created, favorites_count=1)
+        serializer = ShortRecipeSerializer(
+            recipes,
+            many=True,
+            context={'request': request}
         )
-        shopping_cart.delete()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @favorite_batch.mapping.delete
+    def delete_favorite_batch(self, request):
+        recipes = self.get_batch_recipes(request)
+        with transaction.atomic():
+            self.lock_user(request.user)
+            deleted = delete_links(
+                FavoriteRecipe, 'recipe_id', [recipe.id for recipe in recipes],
+                user=request.user
+            )
+            self.change_recipe_counters(deleted, favorites_count=-1)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=['POST'],
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def shopping_cart_batch(self, request):
+        recipes = self.get_batch_recipes(request)
+        with transaction.atomic():
+            self.lock_user(request.user)
+            created = create_links(
+                ShoppingList, 'recipe_id', [recipe.id for recipe in recipes],
+                user=request.user
+            )
+            ShoppingListIngredient.objects.add_recipes(request.user, created)
+            self.change_recipe_counters(created, shopping_carts_count=1)
+        serializer = ShortRecipeSerializer(
+            recipes,
+            many=True,
+            context={'request': request}
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @shopping_cart_batch.mapping.delete
+    def delete_shopping_cart_batch(self, request):
+        recipes = self.get_batch_recipes(request)
+        with transaction.atomic():
+            self.lock_user(request.user)
+            deleted = delete_links(
+                ShoppingList, 'recipe_id', [recipe.id for recipe in recipes],
+                user=request.user
+            )
+            ShoppingListIngredient.objects.remove_recipes(
+                request.user, deleted
+            )
+            self.change_recipe_counters(deleted, shopping_carts_count=-1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=False,
         methods=['GET'],
         permission_classes=(permissions.IsAuthenticated,),
+        renderer_classes=SHOPPING_LIST_RENDERERS,
     )
     def download_shopping_cart(self, request):
-        shopping_cart = ShoppingList.objects.filter(user=self.request.user)
-        recipes = [item.recipe.id for item in shopping_cart]
-        shopping_list = AmountIngredient.objects.filter(
-            recipe__in=recipes
-        ).values(
-            'ingredient'
+        shopping_list = ShoppingListIngredient.objects.filter(
+            user=request.user
+        ).values_list(
+            'ingredient__name',
+            'ingredient__measurement_unit',
         ).annotate(
             amount=Sum('amount')
+        ).order_by('ingredient__name', 'ingredient__measurement_unit')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(shopping_list.iterator()),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
         )
-        shopping_list_text = 'Список покупок: \n'
-        for item in shopping_list:
-            ingredient = Ingredient.objects.get(pk=item['ingredient'])
-            amount = item['amount']
-            shopping_list_text += (
-                f'{ingredient.name}, {amount} '
-                f'{ingredient.measurement_unit}\n'
-            )
-        response = HttpResponse(shopping_list_text, content_type="text/plain")
         response['Content-Disposition'] = (
-            'attachment; filename=shopping-list.txt'
+            f'attachment; filename=shopping-list.{renderer.format}'
         )
         return response
@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from recipes.images import thumbnails_created
+from recipes.models import AmountIngredient, Recipe
+
+from .utils.cache import (RECIPES_KEY, author_recipes_key, bump_on_commit,
+                          recipe_key, user_key)
+
+User = get_user_model()
+
+
+def recipe_changed(sender, instance, created=False, **kwargs):
+    keys = [recipe_key(instance.pk), RECIPES_KEY]
+    if created:
+        # Новый рецепт попадает в ленты подписчиков автора.
+        keys.append(author_recipes_key(instance.author_id))
+    bump_on_commit(*keys)
+
+
+def recipe_deleted(sender, instance, **kwargs):
+    bump_on_commit(
+        recipe_key(instance.pk), RECIPES_KEY,
+        author_recipes_key(instance.author_id)
+    )
+
+
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    bump_on_commit(recipe_key(instance.recipe_id), RECIPES_KEY)
+
+
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        recipes = pk_set or ()
+    else:
+        recipes = (instance.pk,)
+    bump_on_commit(RECIPES_KEY, *map(recipe_key, recipes))
+
+
+def recipe_thumbnails_created(sender, name, **kwargs):
+    recipes = Recipe.objects.filter(image=name).values_list('pk', flat=True)
+    bump_on_commit(RECIPES_KEY, *map(recipe_key, recipes))
+
+
+def user_changed(sender, instance, **kwargs):
+    bump_on_commit(user_key(instance.pk))
+
+
+def connect():
+    post_save.connect(recipe_changed, sender=Recipe)
+    post_delete.connect(recipe_deleted, sender=Recipe)
+    post_save.connect(recipe_ingredients_changed, sender=AmountIngredient)
+    post_delete.connect(recipe_ingredients_changed, sender=AmountIngredient)
+    m2m_changed.connect(recipe_tags_changed, sender=Recipe.tags.through)
+    post_save.connect(user_changed, sender=User)
+    thumbnails_created.connect(recipe_thumbnails_created)
@@ -2,8 +2,10 @@ from rest_framework import serializers
 
 from tags.models import Tag
 
+from ..metrics.serializers import SerializationMetricsMixin
 
-class TagSerializer(serializers.ModelSerializer):
+
+class TagSerializer(SerializationMetricsMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug')
@@ -1,9 +1,14 @@
 from rest_framework import viewsets
 
+from tags.catalog import TAGS
 from tags.models import Tag
+
+from ..utils.mixins import AsyncReadMixin, CatalogListMixin, ReplicaReadMixin
 from .serializers import TagSerializer
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(AsyncReadMixin, ReplicaReadMixin, CatalogListMixin,
+                 viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    catalog = TAGS
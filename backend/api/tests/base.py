@@ -0,0 +1,94 @@
+import base64
+import io
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ingredients.catalog import INGREDIENTS
+from ingredients.models import Ingredient
+from tags.catalog import TAGS
+from tags.models import Tag
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_data(color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (10, 10), color).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_WORKERS=0)
+class APITestCase(TestCase):
+    """Теги, ингредиенты и пользователи для тестов API; кэши очищаются
+    перед каждым тестом.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        # Справочники в памяти процесса помнят версию из прошлого теста.
+        for catalog in (TAGS, INGREDIENTS):
+            catalog.bump()
+        self.tags = [
+            Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}',
+                               slug=f'tag{i}')
+            for i in range(3)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (('абрикосы', 'г'), ('соль', 'г'),
+                               ('вода', 'мл'), ('сок яблочный', 'мл'))
+        ]
+        self.author = self.create_user('author')
+        self.user = self.create_user('user')
+
+    def create_user(self, username):
+        return User.objects.create_user(
+            username=username, email=f'{username}@example.com',
+            first_name='Имя', last_name='Фамилия', password='Pa55word!'
+        )
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def create_recipe(self, author=None, name='Борщ', tags=None,
+                      ingredients=None):
+        tags = self.tags if tags is None else tags
+        ingredients = ingredients or self.ingredients[:2]
+        response = self.client_for(author or self.author).post(
+            '/api/recipes/',
+            {
+                'name': name,
+                'text': 'Описание',
+                'cooking_time': 5,
+                'image': image_data(),
+                'tags': [tag.id for tag in tags],
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': 10}
+                    for ingredient in ingredients
+                ],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
@@ -0,0 +1,16 @@
+from tags.catalog import TAGS
+
+from .base import APITestCase
+
+
+class CatalogTest(APITestCase):
+    def test_version_changes_after_commit(self):
+        version = TAGS.version
+        tag = self.tags[0]
+        tag.name = 'Завтрак'
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+            self.assertEqual(TAGS.load(force=True).version, version)
+        self.assertNotEqual(TAGS.load(force=True).version, version)
+        response = self.client_for().get(f'/api/tags/{tag.id}/')
+        self.assertEqual(response.json()['name'], 'Завтрак')
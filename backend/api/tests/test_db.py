@@ -0,0 +1,185 @@
+import threading
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase
+from psycopg2 import extensions
+
+from foodgram.db.pool import ConnectionPool, PoolTimeoutError
+from foodgram.db.postgresql import base
+
+
+class FakeConnection:
+    isolation_level = extensions.ISOLATION_LEVEL_READ_COMMITTED
+
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = False
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def cursor(self):
+        if not self.alive:
+            raise base.Database.OperationalError('server closed')
+        return mock.MagicMock()
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def test_reuses_last_returned_connection(self):
+        pool = ConnectionPool(max_size=2, timeout=1)
+        first = pool.get(FakeConnection)
+        second = pool.get(FakeConnection)
+        pool.put(first)
+        pool.put(second)
+        self.assertIs(pool.get(FakeConnection), second)
+        self.assertEqual(pool.stats()['size'], 2)
+        self.assertEqual(pool.stats()['in_use_peak'], 2)
+
+    def test_waits_for_returned_connection(self):
+        pool = ConnectionPool(max_size=1, timeout=5)
+        taken = pool.get(FakeConnection)
+        received = []
+        waiter = threading.Thread(
+            target=lambda: received.append(pool.get(FakeConnection))
+        )
+        waiter.start()
+        while not pool.stats()['waiting']:
+            waiter.join(0.01)
+        pool.put(taken)
+        waiter.join()
+        self.assertEqual(received, [taken])
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_timeout_when_all_connections_are_busy(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.get(FakeConnection)
+        with self.assertRaises(PoolTimeoutError):
+            pool.get(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_failed_check_and_connect_free_the_slot(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        dead = pool.get(FakeConnection)
+        pool.put(dead)
+        dead.alive = False
+        fresh = pool.get(FakeConnection, check=base.is_alive)
+        self.assertIsNot(fresh, dead)
+        self.assertTrue(dead.closed)
+        pool.put(fresh, discard=True)
+        self.assertTrue(fresh.closed)
+        with self.assertRaises(RuntimeError):
+            pool.get(mock.Mock(side_effect=RuntimeError))
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_close_discards_idle_and_returned_connections(self):
+        pool = ConnectionPool(max_size=2, timeout=1)
+        idle = pool.get(FakeConnection)
+        busy = pool.get(FakeConnection)
+        pool.put(idle)
+        pool.close()
+        self.assertTrue(idle.closed)
+        pool.put(busy)
+        self.assertTrue(busy.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+class ResetTest(SimpleTestCase):
+    def test_reset(self):
+        idle = FakeConnection()
+        self.assertTrue(base.reset(idle))
+        in_transaction = FakeConnection()
+        in_transaction.status = extensions.TRANSACTION_STATUS_INTRANS
+        self.assertTrue(base.reset(in_transaction))
+        self.assertEqual(in_transaction.rollbacks, 1)
+        broken = FakeConnection()
+        broken.status = extensions.TRANSACTION_STATUS_UNKNOWN
+        self.assertFalse(base.reset(broken))
+        closed = FakeConnection()
+        closed.closed = True
+        self.assertFalse(base.reset(closed))
+
+
+class DatabaseWrapperTest(SimpleTestCase):
+    def wrapper(self, alias='pooled', **settings):
+        return base.DatabaseWrapper({
+            **connection.settings_dict,
+            'ENGINE': 'foodgram.db.postgresql',
+            'NAME': f'{alias}_db',
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False,
+            'OPTIONS': {},
+            **settings,
+        }, alias)
+
+    def pooled(self, alias, **settings):
+        self.addCleanup(base.close_pools, alias)
+        return self.wrapper(alias, OPTIONS={
+            'pool': {'max_size': 1, 'timeout': 0.01}
+        }, **settings)
+
+    def test_pool_cannot_be_combined_with_conn_max_age(self):
+        self.wrapper(CONN_MAX_AGE=60).check_settings()
+        with self.assertRaises(ImproperlyConfigured):
+            self.pooled('max_age', CONN_MAX_AGE=60).check_settings()
+
+    @mock.patch.object(
+        base.base.DatabaseWrapper, 'get_new_connection',
+        side_effect=lambda params: FakeConnection()
+    )
+    def test_connections_return_to_pool(self, connect):
+        first = self.pooled('pool')
+        opened = first.get_new_connection({})
+        first.connection = opened
+        # Незакрытая транзакция откатывается при возврате в пул.
+        opened.status = extensions.TRANSACTION_STATUS_INTRANS
+        first._close()
+        self.assertEqual(opened.rollbacks, 1)
+        self.assertFalse(opened.closed)
+        second = self.pooled('pool')
+        self.assertIs(second.get_new_connection({}), opened)
+        self.assertEqual(connect.call_count, 1)
+        # Пока соединение занято, второе взять негде.
+        with self.assertRaises(base.Database.OperationalError):
+            self.pooled('pool').get_new_connection({})
+
+    @mock.patch.object(
+        base.base.DatabaseWrapper, 'get_new_connection',
+        side_effect=lambda params: FakeConnection()
+    )
+    def test_health_check_replaces_dead_pooled_connection(self, connect):
+        wrapper = self.pooled('health', CONN_HEALTH_CHECKS=True)
+        dead = wrapper.get_new_connection({})
+        wrapper.connection = dead
+        wrapper._close()
+        dead.alive = False
+        fresh = self.pooled('health', CONN_HEALTH_CHECKS=True)
+        self.assertIsNot(fresh.get_new_connection({}), dead)
+        self.assertTrue(dead.closed)
+
+    def test_health_check_once_per_request(self):
+        wrapper = self.wrapper(CONN_HEALTH_CHECKS=True, CONN_MAX_AGE=60)
+        wrapper.connection = FakeConnection()
+        with mock.patch.object(
+            wrapper, 'is_usable', return_value=False
+        ), mock.patch.object(wrapper, 'close') as close:
+            wrapper.close_if_health_check_failed()
+            wrapper.close_if_health_check_failed()
+            self.assertEqual(close.call_count, 1)
+            # Так начало следующего запроса сбрасывает проверку.
+            with mock.patch.object(
+                base.base.DatabaseWrapper, 'close_if_unusable_or_obsolete'
+            ):
+                wrapper.close_if_unusable_or_obsolete()
+            wrapper.close_if_health_check_failed()
+            self.assertEqual(close.call_count, 2)
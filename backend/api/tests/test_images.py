@@ -0,0 +1,59 @@
+from unittest import mock
+
+from recipes.images import image_storage
+from recipes.models import Recipe
+
+from .base import APITestCase, image_data
+
+
+class ImageTest(APITestCase):
+    def test_thumbnails_after_generation(self):
+        first = self.create_recipe()
+        # Ответы пользователю не кэшируются: сброс кэша после миниатюр
+        # откладывается до фиксации, которой в тесте нет.
+        client = self.client_for(self.user)
+        data = client.get(f'/api/recipes/{first["id"]}/').json()
+        self.assertEqual(data['thumbnails'], {})
+        # Миниатюры создаются после фиксации транзакции и отмечаются у всех
+        # рецептов с той же картинкой.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_recipe(name='Суп')
+        data = client.get(f'/api/recipes/{first["id"]}/').json()
+        self.assertEqual(set(data['thumbnails']), {'small', 'medium'})
+        self.assertRegex(
+            data['image'],
+            r'^http://testserver/media/recipes/[0-9a-f]{64}\.png$'
+        )
+        # Картинка уже обработана: новый рецепт только отмечается.
+        with self.captureOnCommitCallbacks(execute=True):
+            last = self.create_recipe(name='Каша')
+        self.assertTrue(Recipe.objects.get(pk=last['id']).has_thumbnails)
+
+    def test_lists_use_thumbnails_without_storage_access(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.create_recipe()
+        client = self.client_for(self.user)
+        with mock.patch.object(
+            image_storage, 'exists', side_effect=AssertionError
+        ):
+            data = client.get('/api/recipes/').json()['results'][0]
+            self.assertEqual(data['image'], data['thumbnails']['medium'])
+            detail = client.get(f'/api/recipes/{recipe["id"]}/').json()
+            self.assertNotEqual(
+                detail['image'], detail['thumbnails']['medium']
+            )
+            response = client.post(f'/api/recipes/{recipe["id"]}/favorite/')
+            self.assertEqual(
+                response.json()['image'], data['thumbnails']['small']
+            )
+
+    def test_new_image_waits_for_thumbnails(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.create_recipe()
+        response = self.client_for(self.author).patch(
+            f'/api/recipes/{recipe["id"]}/',
+            {'image': image_data('blue')}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['thumbnails'], {})
+        self.assertFalse(Recipe.objects.get(pk=recipe['id']).has_thumbnails)
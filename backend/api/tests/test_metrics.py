@@ -0,0 +1,74 @@
+import re
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+
+from ..metrics import middleware
+from ..metrics.registry import registry
+from .base import APITestCase
+
+
+def timings(response):
+    return {
+        name: float(duration) for name, duration
+        in re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing'])
+    }
+
+
+class MetricsTest(APITestCase):
+    def test_metrics_need_token(self):
+        client = self.client_for()
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(client.get('/api/metrics/').status_code, 403)
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(client.get('/api/metrics/').status_code, 403)
+            response = client.get('/api/metrics/',
+                                  HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_SAMPLE_RATE=1.0)
+    def test_serialization_is_timed(self):
+        for number in range(3):
+            self.create_recipe(name=f'Рецепт {number}')
+        registry.reset()
+        # Каждый вызов perf_counter сдвигает часы на 1 мс: время
+        # сериализации видно, даже если она быстрее точности часов.
+        clock = iter(range(10 ** 6))
+        with mock.patch.object(
+            middleware.time, 'perf_counter',
+            lambda: next(clock) / 1000
+        ):
+            response = self.client_for().get('/api/recipes/')
+        parts = timings(response)
+        self.assertEqual(
+            list(parts), ['total', 'db', 'serialize', 'render', 'app']
+        )
+        self.assertGreater(parts['serialize'], 0)
+        self.assertGreater(parts['render'], 0)
+        # Вложенные автор и теги входят в замер рецепта, а не
+        # добавляются к нему: по одному замеру на рецепт.
+        self.assertEqual(parts['serialize'], 3.0)
+        self.assertAlmostEqual(
+            sum(parts.values()) - parts['total'], parts['total']
+        )
+        self.assertIn(
+            'foodgram_serialize_seconds_total{view="api:recipe-list"} 0.003',
+            registry.render()
+        )
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0)
+class AsyncMetricsTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user)
+
+    async def test_queries_are_counted_under_asgi(self):
+        # Под ASGI view выполняется в потоке sync_to_async, а не там,
+        # где работает middleware.
+        response = await self.async_client.get(
+            '/api/users/me/', authorization=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="2 queries', response['Server-Timing'])
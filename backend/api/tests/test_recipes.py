@@ -0,0 +1,612 @@
+import io
+import json
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from ingredients.models import Ingredient
+from recipes.management.commands import reconcile_counters
+from recipes.models import (FavoriteRecipe, Recipe, RecipeQuerySet,
+                            ShoppingListIngredient)
+from users.models import Follow
+
+from ..recipes.feed import Feed
+from ..utils.cache import RESPONSE_CACHE_ALIAS
+from ..utils.toggles import create_link
+from .base import APITestCase, image_data
+
+
+class RecipeListTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for number in range(6):
+            self.create_recipe(name=f'Рецепт {number}')
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        # Анонимный список: count, рецепты, авторы, теги и ингредиенты.
+        # Для пользователя добавляется проверка токена.
+        for user, queries in ((None, 5), (self.user, 6)):
+            client = self.client_for(user)
+            for limit in (1, 3, 6):
+                with self.subTest(user=user, limit=limit):
+                    with self.assertNumQueries(queries):
+                        response = client.get(f'/api/recipes/?limit={limit}')
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.json()['results']), limit)
+
+
+class RecipeFilterTest(APITestCase):
+    def test_tag_and_favorite_filters_use_exists(self):
+        recipe = self.create_recipe()
+        self.create_recipe(name='Суп', tags=self.tags[:1])
+        client = self.client_for(self.user)
+        client.post(f'/api/recipes/{recipe["id"]}/favorite/')
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(
+                '/api/recipes/?is_favorited=1&'
+                + '&'.join(f'tags={tag.slug}' for tag in self.tags)
+            )
+        data = response.json()
+        # Рецепт со всеми тремя тегами не повторяется в выдаче.
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(
+            [result['id'] for result in data['results']], [recipe['id']]
+        )
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT COUNT')
+            or '"recipes_recipe"."name"' in query['sql']
+        ]
+        self.assertEqual(len(queries), 2)
+        for sql in queries:
+            self.assertIn('EXISTS(SELECT (1) AS "a" FROM '
+                          '"recipes_recipe_tags"', sql)
+            self.assertIn('EXISTS(SELECT (1) AS "a" FROM '
+                          '"recipes_favoriterecipe"', sql)
+            self.assertNotIn('DISTINCT', sql)
+            self.assertNotIn('"tags_tag"', sql)
+
+    def test_have_counts_missing_without_counter(self):
+        borscht = self.create_recipe(name='Борщ')['id']
+        soup = self.create_recipe(
+            name='Суп', ingredients=self.ingredients
+        )['id']
+        salad = self.create_recipe(
+            name='Салат', ingredients=self.ingredients[:1]
+        )['id']
+        # Счетчик мог разойтись с ингредиентами, порядок от него не зависит.
+        Recipe.objects.update(ingredients_count=0)
+        ids = ','.join(str(item.id) for item in self.ingredients[:2])
+        client = self.client_for()
+        for params, expected in (
+            ({}, [borscht, salad, soup]),
+            ({'max_missing': 0}, [borscht, salad]),
+            ({'max_missing': 2}, [borscht, salad, soup]),
+        ):
+            with self.subTest(**params):
+                response = client.get(
+                    '/api/recipes/', {'have': ids, **params}
+                )
+                self.assertEqual(
+                    [recipe['id'] for recipe in response.json()['results']],
+                    expected
+                )
+
+
+class RecipeWriteTest(APITestCase):
+    def count_queries(self, method, url, ingredients):
+        client = self.client_for(self.author)
+        data = {
+            'name': 'Борщ', 'text': 'Описание', 'cooking_time': 5,
+            'image': image_data(), 'tags': [self.tags[0].id],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in ingredients
+            ],
+        }
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, data, format='json')
+        self.assertIn(response.status_code, (200, 201), response.content)
+        return len(context.captured_queries), response.json()
+
+    def test_queries_do_not_depend_on_ingredients(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredients = self.ingredients + [
+                Ingredient.objects.create(name=name, measurement_unit='г')
+                for name in ('перец', 'укроп')
+            ]
+        # Справочники тегов и ингредиентов загружаются первым запросом.
+        self.create_recipe()
+        few, _ = self.count_queries(
+            'post', '/api/recipes/', [(ingredients[0], 1)]
+        )
+        many, _ = self.count_queries(
+            'post', '/api/recipes/',
+            [(ingredient, 1) for ingredient in ingredients]
+        )
+        self.assertEqual(few, many)
+        # В обоих рецептах ингредиенты удаляются, меняются и добавляются:
+        # по одному в первом и по два во втором.
+        results = []
+        for size in (1, 2):
+            _, recipe = self.count_queries(
+                'post', '/api/recipes/',
+                [(ingredient, 1) for ingredient in ingredients[:2 * size]]
+            )
+            kept = ingredients[size:3 * size]
+            results.append(self.count_queries(
+                'patch', f'/api/recipes/{recipe["id"]}/',
+                [(ingredient, 5) for ingredient in kept]
+            ))
+        (few, _), (many, recipe) = results
+        self.assertEqual(few, many)
+        self.assertEqual(
+            {(item['id'], item['amount']) for item in recipe['ingredients']},
+            {(ingredient.id, 5) for ingredient in ingredients[2:6]}
+        )
+
+
+class BulkImportTest(APITestCase):
+    def recipe_line(self, name, **fields):
+        return json.dumps({
+            'name': name, 'text': 'Описание', 'cooking_time': 5,
+            'image': image_data(), 'tags': [self.tags[0].id],
+            'ingredients': [
+                {'id': self.ingredients[0].id, 'amount': 2},
+                {'id': self.ingredients[1].id, 'amount': 3},
+            ],
+            **fields,
+        })
+
+    def test_import_and_export(self):
+        lines = [
+            self.recipe_line('Борщ'),
+            '{"name": ',
+            '',
+            self.recipe_line('Суп', cooking_time=0),
+            self.recipe_line('Каша'),
+        ]
+        client = self.client_for(self.author)
+        response = client.generic(
+            'POST', '/api/recipes/bulk/', '\n'.join(lines).encode(),
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (2, 2))
+        self.assertEqual(
+            [result['line'] for result in data['results']], [1, 2, 4, 5]
+        )
+        self.assertIn('errors', data['results'][1])
+        self.assertIn('cooking_time', data['results'][2]['errors'])
+        ids = [data['results'][0]['id'], data['results'][3]['id']]
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 2)
+        response = self.client_for().get('/api/recipes/', {'search': 'каша'})
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']], ids[1:]
+        )
+
+        response = client.get('/api/recipes/export/')
+        self.assertEqual(response.status_code, 200)
+        exported = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual([recipe['id'] for recipe in exported], ids)
+        self.assertEqual(exported[0]['name'], 'Борщ')
+        self.assertEqual(exported[0]['author'], self.author.id)
+        self.assertEqual(exported[0]['tags'], [self.tags[0].id])
+        self.assertEqual(exported[0]['ingredients'], [
+            {'id': self.ingredients[0].id, 'amount': 2},
+            {'id': self.ingredients[1].id, 'amount': 3},
+        ])
+        self.assertEqual(
+            self.client_for().get('/api/recipes/export/').status_code, 401
+        )
+
+    def test_missing_references_are_reported_as_messages(self):
+        line = json.dumps({
+            'name': 'Борщ', 'text': 'Описание', 'cooking_time': 5,
+            'image': image_data(), 'tags': [self.tags[0].id, 9999],
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 1}],
+        })
+        response = self.client_for(self.author).generic(
+            'POST', '/api/recipes/bulk/', line.encode(),
+            content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{
+            'line': 1, 'errors': {'tags': ['Теги не найдены: 9999.']},
+        }])
+
+
+class CountersTest(APITestCase):
+    def test_links_made_outside_the_api_do_not_break_decrements(self):
+        recipe = Recipe.objects.get(pk=self.create_recipe()['id'])
+        FavoriteRecipe.objects.create(user=self.user, recipe=recipe)
+        Follow.objects.create(user=self.user, author=self.author)
+        client = self.client_for(self.user)
+        response = client.delete(f'/api/recipes/{recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 204)
+        response = client.delete(f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(response.status_code, 204)
+        recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 0)
+        self.assertEqual(self.author.followers_count, 0)
+
+    def test_reconcile_counters_in_batches(self):
+        ids = [self.create_recipe(name=f'Рецепт {n}')['id'] for n in range(5)]
+        client = self.client_for(self.user)
+        for pk in ids:
+            client.post(f'/api/recipes/{pk}/favorite/')
+        Recipe.objects.update(favorites_count=7, ingredients_count=0)
+        with mock.patch.object(reconcile_counters, 'BATCH_SIZE', 2):
+            call_command('reconcile_counters', stdout=io.StringIO())
+        self.assertEqual(
+            set(Recipe.objects.values_list(
+                'favorites_count', 'ingredients_count'
+            )),
+            {(1, 2)}
+        )
+        call_command('reconcile_counters', '--check', stdout=io.StringIO())
+
+
+class SearchTest(APITestCase):
+    def search(self, query):
+        response = self.client_for(self.user).get(
+            '/api/recipes/', {'search': query}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_ranking_and_index_updates(self):
+        borscht = self.create_recipe(
+            name='Борщ', ingredients=self.ingredients[:1]
+        )['id']
+        compote = self.create_recipe(
+            name='Компот', ingredients=self.ingredients[3:]
+        )['id']
+        self.assertEqual(self.search('борщ'), [borscht])
+        # Слова ищутся и в ингредиентах.
+        self.assertEqual(self.search('яблочный'), [compote])
+        self.assertEqual(self.search('абрикос'), [borscht])
+        self.assertEqual(self.search('!!!'), [])
+        response = self.client_for(self.author).patch(
+            f'/api/recipes/{compote}/',
+            {'name': 'Компот из абрикосов',
+             'ingredients': [{'id': self.ingredients[2].id, 'amount': 1}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        # Совпадение в названии весит больше совпадения в ингредиентах.
+        self.assertEqual(self.search('абрикос'), [compote, borscht])
+        self.assertEqual(self.search('яблочный'), [])
+        self.client_for(self.author).delete(f'/api/recipes/{borscht}/')
+        self.assertEqual(self.search('абрикос'), [compote])
+
+    def test_search_combines_with_have(self):
+        borscht = self.create_recipe(name='Борщ')
+        self.create_recipe(name='Борщ зеленый',
+                           ingredients=self.ingredients[2:])
+        self.create_recipe(name='Суп')
+        response = self.client_for().get(
+            '/api/recipes/',
+            {'search': 'борщ', 'have': self.ingredients[0].id}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [borscht['id']]
+        )
+
+
+class ResponseCacheTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe()
+        self.anonymous = self.client_for()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.anonymous.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.json()
+
+    def test_repeated_reads_are_cached(self):
+        for url in (f'/api/recipes/{self.recipe["id"]}/', '/api/recipes/'):
+            with self.subTest(url=url):
+                queries, data = self.get(url)
+                self.assertGreater(queries, 0)
+                self.assertEqual(self.get(url), (0, data))
+
+    def test_writes_invalidate_cached_responses(self):
+        detail = f'/api/recipes/{self.recipe["id"]}/'
+        self.get(detail)
+        self.get('/api/recipes/')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(self.author).patch(
+                detail, {'name': 'Щи'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(detail)[1]['name'], 'Щи')
+        self.assertEqual(self.get('/api/recipes/')[1]['results'][0]['name'],
+                         'Щи')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Иван'
+            self.author.save()
+        self.assertEqual(self.get(detail)[1]['author']['first_name'], 'Иван')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_recipe(name='Суп')
+        self.assertEqual(self.get('/api/recipes/')[1]['count'], 2)
+
+    def test_authenticated_reads_are_not_cached(self):
+        client = self.client_for(self.user)
+        client.get('/api/recipes/')
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/recipes/')
+        self.assertGreater(len(context.captured_queries), 0)
+
+
+class PaginationTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        ids = [self.create_recipe(name=f'Рецепт {n}')['id'] for n in range(7)]
+        # Одинаковое время публикации: порядок решает id.
+        Recipe.objects.filter(pk__in=ids[2:5]).update(
+            pub_date=Recipe.objects.get(pk=ids[2]).pub_date
+        )
+        self.expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('pk', flat=True))
+        self.anonymous = self.client_for()
+
+    def test_page_and_limit(self):
+        data = self.anonymous.get('/api/recipes/?page=2&limit=2').json()
+        self.assertEqual(data['count'], 7)
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']], self.expected[2:4]
+        )
+        self.assertEqual(
+            data['next'], 'http://testserver/api/recipes/?limit=2&page=3'
+        )
+        self.assertEqual(
+            data['previous'], 'http://testserver/api/recipes/?limit=2'
+        )
+        data = self.anonymous.get('/api/recipes/?page=4&limit=2').json()
+        self.assertIsNone(data['next'])
+        self.assertEqual(
+            self.anonymous.get('/api/recipes/?page=5&limit=2').status_code,
+            404
+        )
+
+    def test_cursor_walks_all_pages(self):
+        url = '/api/recipes/?pagination=cursor&limit=2'
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = self.anonymous.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any(
+                'COUNT' in query['sql'] for query in context.captured_queries
+            ))
+            data = response.json()
+            self.assertEqual(list(data), ['next', 'results'])
+            seen += [recipe['id'] for recipe in data['results']]
+            url = data['next']
+        self.assertEqual(seen, self.expected)
+
+    def test_cursor_follows_ordering(self):
+        Recipe.objects.filter(pk=self.expected[-1]).update(favorites_count=5)
+        data = self.anonymous.get(
+            '/api/recipes/?ordering=-favorites_count&pagination=cursor&limit=1'
+        ).json()
+        self.assertEqual(data['results'][0]['id'], self.expected[-1])
+        data = self.anonymous.get(data['next']).json()
+        self.assertEqual(data['results'][0]['id'], self.expected[0])
+
+    def test_invalid_cursor(self):
+        response = self.anonymous.get('/api/recipes/?cursor=abc')
+        self.assertEqual(response.status_code, 404)
+
+
+class FeedTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cook = self.create_user('cook')
+        self.stranger = self.create_user('stranger')
+        self.made = []
+        for number in range(4):
+            for author in (self.author, self.cook, self.stranger):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.made.append((author, self.create_recipe(
+                        author=author, name=f'Рецепт {number}'
+                    )['id']))
+        self.client = self.client_for(self.user)
+        for author in (self.author, self.cook):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/users/{author.id}/subscribe/')
+
+    def expected(self, *authors):
+        return [pk for author, pk in reversed(self.made) if author in authors]
+
+    def feed(self, limit=2):
+        url = f'/api/recipes/feed/?limit={limit}'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [recipe['id'] for recipe in response.json()['results']]
+            url = response.json()['next']
+        return seen
+
+    def test_merges_followed_authors(self):
+        expected = self.expected(self.author, self.cook)
+        self.assertEqual(self.feed(), expected)
+        # Голова меньше ленты: дальше лента дочитывается слиянием.
+        with mock.patch.object(Feed, 'head_size', 3):
+            with mock.patch.object(Feed, 'min_step', 1):
+                caches[RESPONSE_CACHE_ALIAS].clear()
+                self.assertEqual(self.feed(), expected)
+                self.assertEqual(self.feed(limit=5), expected)
+        self.client = self.client_for(self.author)
+        self.assertEqual(self.feed(), [])
+        response = self.client_for().get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_follows_new_recipes_and_subscriptions(self):
+        self.feed()
+        with self.captureOnCommitCallbacks(execute=True):
+            new = self.create_recipe(author=self.cook, name='Новый')['id']
+        self.assertEqual(self.feed()[0], new)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_for(self.cook).delete(f'/api/recipes/{new}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/users/{self.cook.id}/subscribe/')
+        self.assertEqual(self.feed(), self.expected(self.author))
+
+    def test_latest_by_author(self):
+        authors = [self.author.id, self.cook.id, self.stranger.id]
+        with mock.patch.object(RecipeQuerySet, 'latest_batch_size', 2):
+            for limit in (0, 2, None):
+                with self.subTest(limit=limit):
+                    latest = Recipe.objects.latest_by_author(authors, limit)
+                    self.assertEqual(list(latest), authors)
+                    for author, recipes in latest.items():
+                        self.assertEqual(
+                            [recipe.id for recipe in recipes],
+                            [
+                                pk for recipe_author, pk
+                                in reversed(self.made)
+                                if recipe_author.id == author
+                            ][:limit]
+                        )
+
+
+class ToggleTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe()
+        self.client = self.client_for(self.user)
+
+    def test_duplicate_and_missing_links(self):
+        for kind, counter, added, missing in (
+            ('favorite', 'favorites_count', 'Рецепт уже в избранном.',
+             'Рецепта нет в избранном, либо он уже удален.'),
+            ('shopping_cart', 'shopping_carts_count',
+             'Рецепт уже в списке покупок.',
+             'Рецепта нет в списке покупок, либо он уже удален.'),
+        ):
+            with self.subTest(kind=kind):
+                url = f'/api/recipes/{self.recipe["id"]}/{kind}/'
+                self.assertEqual(self.client.post(url).status_code, 201)
+                response = self.client.post(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), [added])
+                recipe = Recipe.objects.get(pk=self.recipe['id'])
+                self.assertEqual(getattr(recipe, counter), 1)
+                self.assertEqual(self.client.delete(url).status_code, 204)
+                response = self.client.delete(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), [missing])
+                recipe.refresh_from_db()
+                self.assertEqual(getattr(recipe, counter), 0)
+                url = f'/api/recipes/9999/{kind}/'
+                self.assertEqual(self.client.post(url).status_code, 404)
+                self.assertEqual(self.client.delete(url).status_code, 404)
+
+    def test_integrity_errors_besides_duplicates_propagate(self):
+        recipe = Recipe.objects.get(pk=self.recipe['id'])
+
+        def fail():
+            raise IntegrityError('counter')
+
+        with self.assertRaisesMessage(IntegrityError, 'counter'):
+            with transaction.atomic():
+                create_link(
+                    FavoriteRecipe, fail, user=self.user, recipe=recipe
+                )
+        self.assertFalse(FavoriteRecipe.objects.exists())
+
+
+class BatchToggleTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.ids = [
+            self.create_recipe(name=f'Рецепт {n}')['id'] for n in range(5)
+        ]
+        self.client = self.client_for(self.user)
+
+    def batch(self, method, kind, ids):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(
+                f'/api/recipes/{kind}/', {'ids': ids}, format='json'
+            )
+        return response, len(context.captured_queries)
+
+    def test_cart_batch(self):
+        self.client.post(f'/api/recipes/{self.ids[0]}/shopping_cart/')
+        # Повторы и рецепт, уже лежащий в корзине, не учитываются дважды.
+        response, _ = self.batch(
+            'post', 'shopping_cart', self.ids + self.ids[:2]
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()], self.ids
+        )
+        self.assertEqual(set(Recipe.objects.values_list(
+            'shopping_carts_count', flat=True
+        )), {1})
+        self.assertEqual(
+            dict(ShoppingListIngredient.objects.filter(
+                user=self.user
+            ).values_list('ingredient__name', 'amount')),
+            {'абрикосы': 50, 'соль': 50}
+        )
+        response, _ = self.batch('delete', 'shopping_cart', self.ids[:3])
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            dict(ShoppingListIngredient.objects.filter(
+                user=self.user
+            ).values_list('ingredient__name', 'amount')),
+            {'абрикосы': 20, 'соль': 20}
+        )
+
+    def test_favorite_batch_queries(self):
+        _, few = self.batch('post', 'favorite', self.ids[:2])
+        response, many = self.batch('post', 'favorite', self.ids[2:])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(few, many)
+        self.assertEqual(
+            FavoriteRecipe.objects.filter(user=self.user).count(), 5
+        )
+        _, few = self.batch('delete', 'favorite', self.ids[:2])
+        response, many = self.batch('delete', 'favorite', self.ids[2:])
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(few, many)
+        self.assertFalse(FavoriteRecipe.objects.exists())
+        self.assertEqual(set(Recipe.objects.values_list(
+            'favorites_count', flat=True
+        )), {0})
+
+    def test_invalid_batches(self):
+        response, _ = self.batch('post', 'favorite', [self.ids[0], 9999])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {'ids': ['Рецепты не найдены: 9999.']}
+        )
+        self.assertFalse(FavoriteRecipe.objects.exists())
+        for ids in ([], ['x'], list(range(1, 102))):
+            with self.subTest(ids=ids[:3]):
+                response, _ = self.batch('post', 'shopping_cart', ids)
+                self.assertEqual(response.status_code, 400)
+        response = self.client_for().post(
+            '/api/recipes/favorite/', {'ids': self.ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 401)
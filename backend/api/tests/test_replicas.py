@@ -0,0 +1,108 @@
+import os
+import tempfile
+from unittest import skipUnless
+
+from django.apps import apps
+from django.db import connection, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .base import APITestCase
+
+REPLICA = 'replica1'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Реплика - файл SQLite.')
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaRoutingTest(APITestCase):
+    """Реплика - отдельная база SQLite, в которую копируется основная.
+
+    Записи после копирования на реплику не попадают, как при отставании
+    репликации, поэтому по ответу видно, из какой базы он прочитан.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Псевдоним добавляется после проверок тестового раннера: базу
+        # для него раннер не создает, а роутер не дает мигрировать.
+        handle, cls.replica_name = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        connections.settings[REPLICA] = {
+            **connections['default'].settings_dict, 'NAME': cls.replica_name
+        }
+        with connections[REPLICA].schema_editor() as editor:
+            for model in cls.models():
+                editor.create_model(model)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        os.remove(cls.replica_name)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.old = self.create_recipe(name='Старый')['id']
+        self.replicate()
+        self.new = self.create_recipe(name='Новый')['id']
+
+    @staticmethod
+    def models(include_auto_created=False):
+        return [
+            model for model in apps.get_models(include_auto_created)
+            if model._meta.managed and not model._meta.proxy
+        ]
+
+    def replicate(self):
+        with connections[REPLICA].constraint_checks_disabled():
+            for model in self.models(include_auto_created=True):
+                manager = model._base_manager
+                manager.using(REPLICA).all().delete()
+                manager.using(REPLICA).bulk_create(manager.all())
+
+    def get(self, client, url):
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(replica.captured_queries)
+
+    def ids(self, data):
+        return [recipe['id'] for recipe in data['results']]
+
+    def test_reads_go_to_replica(self):
+        # Токен создан после копирования: он проверяется по основной базе.
+        client = self.client_for(self.user)
+        data, replica_queries = self.get(client, '/api/recipes/')
+        self.assertEqual(self.ids(data), [self.old])
+        self.assertGreater(replica_queries, 0)
+        data, _ = self.get(client, f'/api/recipes/{self.old}/')
+        self.assertEqual(data['name'], 'Старый')
+        data, _ = self.get(client, '/api/tags/')
+        self.assertEqual(len(data), 3)
+
+    def test_user_reads_own_writes_from_primary(self):
+        # Автор только что создал рецепт и читает с основной базы.
+        data, replica_queries = self.get(
+            self.client_for(self.author), '/api/recipes/'
+        )
+        self.assertEqual(self.ids(data), [self.new, self.old])
+        self.assertEqual(replica_queries, 0)
+        client = self.client_for(self.user)
+        response = client.post(f'/api/recipes/{self.new}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        data, replica_queries = self.get(client, '/api/recipes/')
+        self.assertEqual(self.ids(data), [self.new, self.old])
+        self.assertTrue(data['results'][0]['is_favorited'])
+        self.assertEqual(replica_queries, 0)
+
+    def test_writes_and_other_reads_use_primary(self):
+        client = self.client_for(self.user)
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = client.post(f'/api/users/{self.author.id}/subscribe/')
+            self.assertEqual(response.status_code, 201)
+            response = client.get('/api/recipes/download_shopping_cart/')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica.captured_queries, [])
@@ -0,0 +1,239 @@
+import io
+import json
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
+from rest_framework.authtoken.models import Token
+
+from foodgram.handlers import ASGIHandler
+from ingredients.models import Ingredient
+from recipes.management.commands import rebuild_shopping_lists
+from recipes.models import AmountIngredient, Recipe, ShoppingListIngredient
+
+from ..recipes.renderers import ShoppingListRenderer
+from .base import APITestCase, User
+
+
+class ShoppingListTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.borscht = self.create_recipe(name='Борщ')
+        self.soup = self.create_recipe(
+            name='Суп', ingredients=self.ingredients[1:3]
+        )
+        self.client = self.client_for(self.user)
+        for recipe in (self.borscht, self.soup):
+            response = self.client.post(
+                f'/api/recipes/{recipe["id"]}/shopping_cart/'
+            )
+            self.assertEqual(response.status_code, 201)
+
+    def download(self):
+        response = self.client_for(self.user).get(
+            '/api/recipes/download_shopping_cart/', {'format': 'json'}
+        )
+        self.assertEqual(response.status_code, 200)
+        return {
+            item['name']: item['amount']
+            for item in json.loads(b''.join(response.streaming_content))
+        }
+
+    def login_admin(self):
+        admin = self.create_user('admin')
+        admin.is_staff = admin.is_superuser = True
+        admin.save()
+        self.client.force_login(admin)
+
+    def test_cart_is_summed(self):
+        self.assertEqual(
+            self.download(), {'абрикосы': 10, 'соль': 20, 'вода': 10}
+        )
+
+    def test_removed_recipe_is_subtracted(self):
+        response = self.client.delete(
+            f'/api/recipes/{self.soup["id"]}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.download(), {'абрикосы': 10, 'соль': 10})
+
+    def test_recipe_update_changes_carts(self):
+        response = self.client_for(self.author).patch(
+            f'/api/recipes/{self.borscht["id"]}/',
+            {'ingredients': [
+                {'id': self.ingredients[1].id, 'amount': 5},
+                {'id': self.ingredients[3].id, 'amount': 7},
+            ]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.download(), {'соль': 15, 'вода': 10, 'сок яблочный': 7}
+        )
+
+    def test_admin_recipe_change_updates_carts(self):
+        self.login_admin()
+        recipe = Recipe.objects.get(pk=self.borscht['id'])
+        amounts = list(AmountIngredient.objects.filter(recipe=recipe))
+        data = {
+            'name': recipe.name,
+            'author': recipe.author_id,
+            'tags': [tag.id for tag in self.tags],
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'amount_ingredients-TOTAL_FORMS': len(amounts) + 1,
+            'amount_ingredients-INITIAL_FORMS': len(amounts),
+            'amount_ingredients-MIN_NUM_FORMS': 0,
+            'amount_ingredients-MAX_NUM_FORMS': 1000,
+            'amount_ingredients-2-recipe': recipe.pk,
+            'amount_ingredients-2-ingredient': self.ingredients[2].id,
+            'amount_ingredients-2-amount': 3,
+        }
+        for index, amount in enumerate(amounts):
+            data.update({
+                f'amount_ingredients-{index}-id': amount.pk,
+                f'amount_ingredients-{index}-recipe': recipe.pk,
+                f'amount_ingredients-{index}-ingredient': amount.ingredient_id,
+                f'amount_ingredients-{index}-amount': amount.amount,
+            })
+        # Первый ингредиент удаляется, второй меняется, третий добавляется.
+        data['amount_ingredients-0-DELETE'] = 'on'
+        data['amount_ingredients-1-amount'] = 1
+        response = self.client.post(
+            f'/admin/recipes/recipe/{recipe.pk}/change/', data
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.download(), {'соль': 11, 'вода': 13})
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredients_count, 2)
+
+    def test_rebuild_in_batches(self):
+        for number in range(4):
+            client = self.client_for(self.create_user(f'buyer{number}'))
+            client.post(f'/api/recipes/{self.borscht["id"]}/shopping_cart/')
+        ShoppingListIngredient.objects.update(amount=1)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_shopping_lists', '--check')
+        with mock.patch.object(rebuild_shopping_lists, 'BATCH_SIZE', 2):
+            call_command('rebuild_shopping_lists', stdout=io.StringIO())
+        call_command(
+            'rebuild_shopping_lists', '--check', stdout=io.StringIO()
+        )
+        self.assertEqual(
+            self.download(), {'абрикосы': 10, 'соль': 20, 'вода': 10}
+        )
+
+    def test_deleted_author_recipes_leave_carts(self):
+        self.author.delete()
+        self.assertEqual(self.download(), {})
+
+    def test_admin_recipe_delete_updates_carts(self):
+        self.login_admin()
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.soup["id"]}/delete/',
+            {'post': 'yes'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.download(), {'абрикосы': 10, 'соль': 10})
+
+
+class DownloadFormatTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        recipe = self.create_recipe()
+        self.client = self.client_for(self.user)
+        self.client.post(f'/api/recipes/{recipe["id"]}/shopping_cart/')
+
+    def download(self, **kwargs):
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', **kwargs
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_text_is_default(self):
+        response, content = self.download()
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename=shopping-list.txt'
+        )
+        self.assertEqual(
+            content, 'Список покупок: \nабрикосы, 10 г\nсоль, 10 г\n'
+        )
+
+    def test_csv_by_accept_header(self):
+        response, content = self.download(HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(content.splitlines(), [
+            'Ингредиент,Количество,Единицы измерения',
+            'абрикосы,10,г',
+            'соль,10,г',
+        ])
+
+    def test_json_by_format(self):
+        _, content = self.download(data={'format': 'json'})
+        self.assertEqual(json.loads(content), [
+            {'name': 'абрикосы', 'measurement_unit': 'г', 'amount': 10},
+            {'name': 'соль', 'measurement_unit': 'г', 'amount': 10},
+        ])
+
+    def test_empty_cart(self):
+        self.client = self.client_for(self.author)
+        _, content = self.download(data={'format': 'json'})
+        self.assertEqual(json.loads(content), [])
+
+    def test_anonymous(self):
+        response = self.client_for().get(
+            '/api/recipes/download_shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class ASGIDownloadTest(TransactionTestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='user', password='x')
+        self.token = Token.objects.create(user=user).key
+        for name in ('абрикосы', 'вода', 'соль'):
+            ShoppingListIngredient.objects.create(
+                user=user, amount=10, ingredient=Ingredient.objects.create(
+                    name=name, measurement_unit='г'
+                )
+            )
+
+    async def download(self):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request'}
+
+        async def send(message):
+            messages.append(message)
+
+        await ASGIHandler()({
+            'type': 'http',
+            'method': 'GET',
+            'path': '/api/recipes/download_shopping_cart/',
+            'query_string': b'format=json',
+            'headers': [
+                (b'authorization', f'Token {self.token}'.encode()),
+            ],
+        }, receive, send)
+        return messages
+
+    async def test_streams_parts_outside_event_loop(self):
+        # В цикле событий ORM вызвал бы SynchronousOnlyOperation.
+        with mock.patch.object(ShoppingListRenderer, 'chunk_size', 1):
+            messages = await self.download()
+        self.assertEqual(messages[0]['status'], 200)
+        bodies = [message['body'] for message in messages[1:-1]]
+        self.assertEqual(len(bodies), 4)
+        self.assertTrue(all(
+            message['more_body'] for message in messages[1:-1]
+        ))
+        self.assertFalse(messages[-1].get('more_body', False))
+        self.assertEqual(
+            [item['name'] for item in json.loads(b''.join(bodies))],
+            ['абрикосы', 'вода', 'соль']
+        )
@@ -0,0 +1,93 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Follow
+
+from .base import APITestCase
+
+
+class SubscriptionsTest(APITestCase):
+    def test_zero_recipes_limit(self):
+        self.create_recipe()
+        client = self.client_for(self.user)
+        response = client.post(
+            f'/api/users/{self.author.id}/subscribe/?recipes_limit=0'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['recipes'], [])
+        self.assertEqual(response.json()['recipes_count'], 1)
+        response = client.get('/api/users/subscriptions/?recipes_limit=0')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['recipes'], [])
+
+    def test_cursor_pagination(self):
+        authors = [self.create_user(f'author{n}') for n in range(5)]
+        for author in authors:
+            Follow.objects.create(user=self.user, author=author)
+        client = self.client_for(self.user)
+        url = '/api/users/subscriptions/?pagination=cursor&limit=2'
+        seen = []
+        while url:
+            data = client.get(url).json()
+            self.assertNotIn('count', data)
+            seen += [author['id'] for author in data['results']]
+            url = data['next']
+        self.assertEqual(seen, [author.id for author in authors])
+        data = client.get('/api/users/subscriptions/?page=3&limit=2').json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(
+            [author['id'] for author in data['results']], [authors[4].id]
+        )
+
+    def test_recipes_limit_and_queries(self):
+        client = self.client_for(self.user)
+        authors = [self.create_user(f'author{n}') for n in range(4)]
+        for number, author in enumerate(authors):
+            Follow.objects.create(user=self.user, author=author)
+            for index in range(number):
+                self.create_recipe(author=author, name=f'{author.id}-{index}')
+        queries = []
+        for limit in (2, 4):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(
+                    f'/api/users/subscriptions/?limit={limit}&recipes_limit=2'
+                )
+            self.assertEqual(response.status_code, 200)
+            queries.append(len(context.captured_queries))
+        self.assertEqual(queries[0], queries[1])
+        for number, author in enumerate(response.json()['results']):
+            self.assertTrue(author['is_subscribed'])
+            self.assertEqual(author['recipes_count'], number)
+            self.assertEqual(
+                [recipe['name'] for recipe in author['recipes']],
+                [f'{author["id"]}-{index}'
+                 for index in reversed(range(number))][:2]
+            )
+        response = client.get('/api/users/subscriptions/?recipes_limit=-1')
+        self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_and_missing_subscriptions(self):
+        client = self.client_for(self.user)
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(client.post(url).status_code, 201)
+        response = client.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {'errors': 'Вы уже подписались на этого автора.'}
+        )
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(client.delete(url).status_code, 204)
+        response = client.delete(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'errors': 'Нет такой подписки'})
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+        response = client.post(f'/api/users/{self.user.id}/subscribe/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            client.post('/api/users/9999/subscribe/').status_code, 404
+        )
+        self.assertEqual(
+            client.delete('/api/users/9999/subscribe/').status_code, 404
+        )
@@ -2,6 +2,7 @@ from django.urls import include, path
 from rest_framework import routers
 
 from .ingredients.views import IngredientViewSet
+from .metrics.views import metrics
 from .recipes.views import RecipeViewSet
 from .tags.views import TagViewSet
 from .users.views import CustomUserViewSet
@@ -21,6 +22,7 @@ djoser = [
 ]
 
 urlpatterns = [
+    path('metrics/', metrics, name='metrics'),
     path('', include(router_api.urls)),
     path('', include(djoser)),
 ]
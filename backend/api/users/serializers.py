@@ -3,18 +3,21 @@ from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
 from recipes.models import Recipe
+from ..metrics.serializers import SerializationMetricsMixin
+from ..recipes.fields import ThumbnailImageField
 
 User = get_user_model()
 
 
-class CustomCreateUserSerializer(UserCreateSerializer):
+class CustomCreateUserSerializer(SerializationMetricsMixin,
+                                 UserCreateSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'first_name', 'last_name', 'email',
                   'password')
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SerializationMetricsMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -25,6 +28,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         if self.context['request'].user.is_authenticated:
             return obj.following.filter(
                 user=self.context['request'].user
@@ -32,27 +37,36 @@ class CustomUserSerializer(UserSerializer):
         return False
 
 
+class RecipesLimitSerializer(serializers.Serializer):
+    recipes_limit = serializers.IntegerField(min_value=0, required=False)
+
+
 class FollowSerializer(CustomUserSerializer):
+    """Автор с последними рецептами.
+
+    Рецепты берутся из context['recipes'] ({author_id: [...]}), который
+    view собирает одним запросом на всю страницу, и context['recipes_limit'].
+    """
+
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta(CustomUserSerializer.Meta):
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes_limit = request.GET.get('recipes_limit')
-        queryset = obj.recipes.all()
-        if recipes_limit:
-            queryset = queryset[:int(recipes_limit)]
-        return ShortRecipeSerializer(queryset, many=True).data
+        recipes = self.context.get('recipes')
+        if recipes is None:
+            recipes = Recipe.objects.latest_by_author(
+                [obj.id], self.context.get('recipes_limit')
+            )
+        return ShortRecipeSerializer(recipes[obj.id], many=True).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
 
+class ShortRecipeSerializer(SerializationMetricsMixin,
+                            serializers.ModelSerializer):
+    image = ThumbnailImageField('small')
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
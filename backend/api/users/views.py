@@ -1,53 +1,92 @@
 from django.contrib.auth import get_user_model
+from django.db.models import BooleanField, Value
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from recipes.models import Recipe, change_counters
 from users.models import Follow
+from ..utils.cache import bump_on_commit, follows_key
+from ..utils.mixins import ReplicaReadMixin
 from ..utils.paginators import PageLimitPaginator
-from .serializers import FollowSerializer
+from ..utils.toggles import create_link, delete_link
+from .serializers import FollowSerializer, RecipesLimitSerializer
 
 User = get_user_model()
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ReplicaReadMixin, UserViewSet):
     pagination_class = PageLimitPaginator
+    cursor_ordering = ('id',)
+    replica_read_actions = ('subscriptions',)
+
+    def get_recipes_limit(self):
+        serializer = RecipesLimitSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get('recipes_limit')
 
     @action(detail=False, permission_classes=[permissions.IsAuthenticated])
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user)
+        recipes_limit = self.get_recipes_limit()
+        queryset = User.objects.filter(
+            following__user=request.user
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('id')
         page = self.paginate_queryset(queryset)
-        serializer = FollowSerializer(page, many=True,
-                                      context={'request': request})
+        serializer = FollowSerializer(page, many=True, context={
+            'request': request,
+            'recipes_limit': recipes_limit,
+            'recipes': Recipe.objects.latest_by_author(
+                [author.id for author in page], recipes_limit
+            ),
+        })
         return self.get_paginated_response(serializer.data)
 
+    def subscription_changed(self, author_id, delta):
+        change_counters(
+            User.objects.filter(pk=author_id), followers_count=delta
+        )
+        bump_on_commit(follows_key(self.request.user.pk))
+
     @action(detail=True,
             methods=['POST'],
             permission_classes=[permissions.IsAuthenticated])
     def subscribe(self, request, id=None):
+        recipes_limit = self.get_recipes_limit()
         user = request.user
         author = get_object_or_404(User, id=id)
         if user == author:
             return Response({'errors':
                             'Вы не можете подписаться на себя.'},
                             status=status.HTTP_400_BAD_REQUEST)
-        if Follow.objects.filter(user=user, author=author).exists():
+        if not create_link(
+            Follow,
+            lambda: self.subscription_changed(author.pk, 1),
+            user=user,
+            author=author,
+        ):
             return Response({'errors':
                             'Вы уже подписались на этого автора.'},
                             status=status.HTTP_400_BAD_REQUEST)
-        Follow.objects.create(user=user, author=author)
-        serializer = FollowSerializer(author,
-                                      context={'request': request})
+        author.is_subscribed = True
+        serializer = FollowSerializer(author, context={
+            'request': request,
+            'recipes_limit': recipes_limit,
+        })
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def delete_subscribe(self, request, id=None):
-        user = request.user
-        author = get_object_or_404(User, id=id)
-        if not Follow.objects.filter(user=user, author=author).exists():
+        if not delete_link(
+            Follow,
+            User.objects.filter(id=id).exists,
+            lambda: self.subscription_changed(id, -1),
+            user=request.user,
+            author_id=id,
+        ):
             return Response({'errors': 'Нет такой подписки'},
                             status=status.HTTP_400_BAD_REQUEST)
-        Follow.objects.get(user=user, author=author).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,124 @@
+import time
+from hashlib import md5
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from foodgram.db.routers import reading_from_replica
+
+RESPONSE_CACHE_ALIAS = settings.RESPONSE_CACHE_ALIAS
+
+
+def new_token():
+    # Время создания токена нужно, чтобы не кэшировать ответ, построенный
+    # по реплике, до которой изменение могло еще не дойти.
+    return f'{time.time():.3f}:{uuid4().hex}'
+
+
+def changed_recently(tokens, seconds):
+    """Менялся ли какой-нибудь из токенов за последние seconds секунд."""
+    since = time.time() - seconds
+    for token in tokens:
+        created, _, _ = str(token).partition(':')
+        try:
+            if float(created) > since:
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+def get_tokens(keys):
+    """Текущие токены зависимостей; отсутствующие создаются."""
+    keys = list(keys)
+    tokens = cache.get_many(keys)
+    missing = [key for key in keys if key not in tokens]
+    if missing:
+        for key in missing:
+            cache.add(key, new_token(), None)
+        tokens.update(cache.get_many(missing))
+    return tokens
+
+
+def bump(*keys):
+    """Меняет токены, делая недействительными все зависящие от них записи."""
+    cache.set_many({key: new_token() for key in keys}, None)
+
+
+def bump_on_commit(*keys):
+    # Токены меняются только после фиксации транзакции, иначе параллельный
+    # запрос успеет закэшировать старые данные уже под новым токеном.
+    transaction.on_commit(lambda: bump(*keys))
+
+
+def recipe_key(recipe_id):
+    return f'dependency:recipe:{recipe_id}'
+
+
+def user_key(user_id):
+    return f'dependency:user:{user_id}'
+
+
+def author_recipes_key(author_id):
+    # Меняется, когда у автора появляется или удаляется рецепт.
+    return f'dependency:user:{author_id}:recipes'
+
+
+def follows_key(user_id):
+    # Меняется при подписке и отписке пользователя.
+    return f'dependency:user:{user_id}:follows'
+
+
+RECIPES_KEY = 'dependency:recipes'
+RECIPE_COUNTERS_KEY = 'dependency:recipes:counters'
+
+
+class ResponseCache:
+    """Кэш ответов, привязанный к токенам зависимостей, а не к TTL.
+
+    Вместе с ответом сохраняются токены, действовавшие на момент его
+    построения. Запись считается свежей, пока ни один из токенов не
+    поменялся.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def store(self):
+        return caches[RESPONSE_CACHE_ALIAS]
+
+    def make_key(self, request):
+        params = sorted(
+            (param, value)
+            for param, values in request.query_params.lists()
+            for value in values
+        )
+        url = f'{request.get_host()}{request.path}?{urlencode(params)}'
+        return f'response:{self.name}:{md5(url.encode()).hexdigest()}'
+
+    def fetch(self, request, render, tokens, dependencies):
+        """Отдает ответ из кэша или строит его через render().
+
+        tokens - токены, прочитанные до построения ответа;
+        dependencies(data) - ключи, известные только по данным ответа.
+        """
+        key = self.make_key(request)
+        entry = self.store.get(key)
+        if entry is not None and get_tokens(entry['tokens']) == (
+            entry['tokens']
+        ):
+            return Response(entry['data'])
+        response = render()
+        if response.status_code == status.HTTP_200_OK:
+            tokens = {**tokens, **get_tokens(dependencies(response.data))}
+            if not (reading_from_replica() and changed_recently(
+                tokens.values(), settings.REPLICA_LAG_SECONDS
+            )):
+                self.store.set(key, {'data': response.data, 'tokens': tokens})
+        return response
@@ -0,0 +1,96 @@
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework import permissions, status
+from rest_framework.response import Response
+
+from foodgram.db.routers import pinned_to_primary, read_routing, use_replica
+
+
+class CatalogListMixin:
+    """Список справочника из памяти процесса с ETag по версии справочника."""
+
+    catalog = None
+
+    def list(self, request, *args, **kwargs):
+        etag = f'"{self.catalog.version}"'
+        if etag in (
+            tag.strip() for tag
+            in request.headers.get('If-None-Match', '').split(',')
+        ):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag}
+            )
+        queryset = self.filter_queryset(self.catalog.instances())
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, headers={'ETag': etag})
+
+
+class AsyncReadMixin:
+    """Под ASGI (ASYNC_VIEWS) чтения async_read_actions выполняются
+    параллельно в пуле потоков.
+
+    Синхронные view под ASGI Django выполняет по очереди в одном потоке,
+    и медленный запрос задерживает все остальные. Чтения из
+    async_read_actions уходят в пул потоков цикла событий, у каждого
+    потока свое соединение с базой; прочие запросы выполняются как
+    раньше. Асинхронного ORM в Django 3.2 нет, поэтому сами view
+    остаются синхронными. Потоковые ответы по частям отдает
+    foodgram.handlers.ASGIHandler.
+    """
+
+    async_read_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_VIEWS:
+            return view
+
+        def run_offloaded(request, *args, **kwargs):
+            # Как request_started/request_finished, но для соединения
+            # потока из пула.
+            close_old_connections()
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                close_old_connections()
+
+        offloaded = sync_to_async(run_offloaded, thread_sensitive=False)
+        serialized = sync_to_async(view, thread_sensitive=True)
+
+        async def async_view(request, *args, **kwargs):
+            method = 'get' if request.method == 'HEAD' else (
+                request.method.lower()
+            )
+            if (actions or {}).get(method) in cls.async_read_actions:
+                return await offloaded(request, *args, **kwargs)
+            return await serialized(request, *args, **kwargs)
+
+        return update_wrapper(async_view, view)
+
+
+class ReplicaReadMixin:
+    """Чтения replica_read_actions идут на реплику (REPLICA_DATABASES).
+
+    Пользователь, недавно что-то изменивший, читает с основной базы,
+    чтобы сразу видеть свои изменения.
+    """
+
+    replica_read_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        with read_routing():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        # Пользователь известен только после аутентификации.
+        super().initial(request, *args, **kwargs)
+        if (
+            request.method in permissions.SAFE_METHODS
+            and self.action in self.replica_read_actions
+            and not pinned_to_primary(request.user)
+        ):
+            use_replica()
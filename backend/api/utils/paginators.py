@@ -1,6 +1,130 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPaginator:
+    """Постраничный вывод по курсору без COUNT(*) и OFFSET.
+
+    Курсор - значения полей ordering у последнего объекта страницы,
+    следующая страница начинается строго после него. Последнее поле
+    ordering должно быть уникальным.
+    """
+
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def __init__(self, ordering, page_size):
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request):
+        queryset = queryset.order_by(*self.ordering)
+
+        def fetch(position, limit):
+            if position is None:
+                return list(queryset[:limit])
+            return list(queryset.filter(self.after(position))[:limit])
+
+        return self.paginate(request, queryset.model, fetch)
+
+    def paginate(self, request, model, fetch):
+        """Страница из fetch(position, limit) - не больше limit объектов
+        строго после позиции position (None - с самого начала).
+        """
+        self.request = request
+        results = fetch(
+            self.decode_cursor(request, model), self.page_size + 1
+        )
+        self.page = results[:self.page_size]
+        self.has_next = len(results) > self.page_size
+        return self.page
+
+    def after(self, position):
+        condition = Q()
+        for index, (order, field) in enumerate(
+            zip(self.ordering, self.fields)
+        ):
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            condition |= Q(
+                **dict(zip(self.fields[:index], position[:index])),
+                **{f'{field}__{lookup}': position[index]}
+            )
+        return condition
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance):
+        values = []
+        for field in self.fields:
+            value = getattr(instance, field)
+            values.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+            )
+        return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
 
 
 class PageLimitPaginator(PageNumberPagination):
+    """Номера страниц по умолчанию, курсор - по запросу клиента.
+
+    Курсорный режим включается параметром ?pagination=cursor (или
+    переданным cursor) во view, где задан cursor_ordering.
+    """
+
     page_size = 6
     page_size_query_param = 'limit'
+    keyset = None
+
+    def use_cursor(self, request, view):
+        return getattr(view, 'cursor_ordering', None) and (
+            request.query_params.get('pagination') == 'cursor'
+            or KeysetPaginator.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request, view):
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = KeysetPaginator(
+            view.cursor_ordering, self.get_page_size(request)
+        )
+        return self.keyset.paginate_queryset(queryset, request)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,73 @@
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import NotFound
+
+
+def create_link(model, on_created=None, **fields):
+    """Создает связь (избранное, корзина, подписка) одним INSERT.
+
+    on_created() выполняется в той же транзакции. Возвращает False, если
+    связь уже есть: повторный или параллельный запрос упирается
+    в уникальное ограничение. Остальные ошибки целостности, в том числе
+    из on_created(), пробрасываются.
+    """
+    with transaction.atomic(savepoint=False):
+        try:
+            # Точка сохранения нужна, чтобы нарушение уникальности не
+            # прерывало внешнюю транзакцию.
+            with transaction.atomic():
+                model.objects.create(**fields)
+        except IntegrityError:
+            if not model.objects.filter(**fields).exists():
+                raise
+            return False
+        if on_created is not None:
+            on_created()
+    return True
+
+
+def delete_link(model, target_exists, on_deleted=None, **fields):
+    """Удаляет связь одним DELETE, проверяя число удаленных строк.
+
+    Если удалять нечего, target_exists() отличает отсутствующий объект
+    (404) от отсутствующей связи (False).
+    """
+    with transaction.atomic():
+        deleted, _ = model.objects.filter(**fields).delete()
+        if deleted and on_deleted is not None:
+            on_deleted()
+    if not deleted and not target_exists():
+        raise NotFound
+    return bool(deleted)
+
+
+def create_links(model, target_field, target_ids, **fields):
+    """Создает недостающие связи с target_ids одним bulk INSERT.
+
+    Возвращает id, для которых связь появилась. Вызывается в транзакции
+    с заблокированным владельцем связей; одиночные изменения его связей
+    берут ту же блокировку, иначе параллельный запрос изменит связи между
+    чтением и записью и они будут учтены дважды.
+    """
+    existing = set(model.objects.filter(
+        **fields, **{f'{target_field}__in': target_ids}
+    ).values_list(target_field, flat=True))
+    created = [pk for pk in target_ids if pk not in existing]
+    model.objects.bulk_create(
+        [model(**fields, **{target_field: pk}) for pk in created],
+        ignore_conflicts=True
+    )
+    return created
+
+
+def delete_links(model, target_field, target_ids, **fields):
+    """Удаляет связи с target_ids одним DELETE, возвращает их id.
+
+    Как и create_links, вызывается с заблокированным владельцем связей.
+    """
+    links = model.objects.filter(
+        **fields, **{f'{target_field}__in': target_ids}
+    )
+    deleted = list(links.values_list(target_field, flat=True))
+    if deleted:
+        links.filter(**{f'{target_field}__in': deleted}).delete()
+    return deleted
@@ -0,0 +1,115 @@
+import time
+from threading import Lock
+from uuid import uuid4
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+class CatalogData:
+    def __init__(self, version, items):
+        self.version = version
+        self.items = items
+        self.derived = {}
+
+
+class Catalog:
+    """Справочник, загруженный в память процесса как {id: (поля...)}.
+
+    Версия справочника хранится в общем кэше: изменение записи в любом
+    процессе меняет версию, и остальные процессы перечитывают таблицу
+    при следующем обращении (не чаще раза в check_interval секунд).
+    """
+
+    check_interval = 1.0
+
+    def __init__(self, model_label, fields):
+        self.model_label = model_label
+        self.fields = tuple(fields)
+        self.version_key = f'catalog:{model_label.lower()}:version'
+        self.data = None
+        self.checked_at = 0
+        self.lock = Lock()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def version(self):
+        return self.load().version
+
+    def shared_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, uuid4().hex, None)
+            version = cache.get(self.version_key)
+        return version
+
+    def load(self, force=False):
+        data = self.data
+        now = time.monotonic()
+        if data is not None and not force and (
+            now - self.checked_at < self.check_interval
+        ):
+            return data
+        version = self.shared_version()
+        if data is None or data.version != version:
+            with self.lock:
+                data = self.data
+                if data is None or data.version != version:
+                    data = CatalogData(version, {
+                        pk: values for pk, *values
+                        # Справочник живет до смены версии и не должен
+                        # попасть в память из отставшей реплики.
+                        in self.model.objects.using(
+                            DEFAULT_DB_ALIAS
+                        ).values_list('pk', *self.fields)
+                    })
+                    self.data = data
+        self.checked_at = now
+        return data
+
+    def items(self):
+        return self.load().items
+
+    def get(self, pk):
+        values = self.items().get(pk)
+        if values is None:
+            values = self.load(force=True).items.get(pk)
+        return values
+
+    def instance(self, pk):
+        instance = self.instance_map().get(pk)
+        if instance is None:
+            self.load(force=True)
+            instance = self.instance_map().get(pk)
+        if instance is None:
+            instance = self.model.objects.filter(pk=pk).first()
+        return instance
+
+    def instances(self):
+        return list(self.instance_map().values())
+
+    def instance_map(self):
+        return self.derive('instances', lambda items: {
+            pk: self.model(pk=pk, **dict(zip(self.fields, values)))
+            for pk, values in items.items()
+        })
+
+    def derive(self, name, factory):
+        """Структура, построенная из справочника и живущая до его смены."""
+        data = self.load()
+        if name not in data.derived:
+            data.derived[name] = factory(data.items)
+        return data.derived[name]
+
+    def invalidate(self, using=None, **kwargs):
+        # Версия меняется только после фиксации транзакции, иначе соседний
+        # процесс успеет перечитать старые записи уже под новой версией.
+        transaction.on_commit(self.bump, using=using)
+
+    def bump(self):
+        cache.set(self.version_key, uuid4().hex, None)
+        self.data = None
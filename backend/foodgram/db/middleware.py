@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from .routers import pin_to_primary
+
+
+class PrimaryAfterWriteMiddleware(MiddlewareMixin):
+    """После успешного изменяющего запроса пользователь читает с основной
+    базы REPLICA_LAG_SECONDS секунд.
+
+    Пользователь, аутентифицированный по токену, известен только после
+    view: DRF записывает его в request.user исходного запроса.
+    """
+
+    def process_response(self, request, response):
+        user = getattr(request, 'user', None)
+        if (
+            settings.REPLICA_DATABASES
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user)
+        return response
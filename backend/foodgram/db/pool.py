@@ -0,0 +1,141 @@
+import time
+from collections import deque
+from threading import Condition, Lock
+
+pools = {}
+pools_lock = Lock()
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Открытые соединения с базой, общие для потоков процесса.
+
+    Больше max_size соединений процесс не открывает: поток, которому не
+    хватило соединения, ждет освобождения не дольше timeout секунд.
+    Свободные соединения выдаются начиная с последнего возвращенного.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle = deque()
+        self.size = 0
+        self.condition = Condition()
+        self.waiting = 0
+        self.peak = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.closed = False
+
+    def get(self, connect, check=None):
+        """Свободное соединение, прошедшее check, или новое из connect()."""
+        while True:
+            connection = self.acquire()
+            if connection is None:
+                return self.open(connect)
+            if check is None or check(connection):
+                return connection
+            self.put(connection, discard=True)
+
+    def acquire(self):
+        with self.condition:
+            self.checkouts += 1
+            started = None
+            while not self.idle and self.size >= self.max_size:
+                if started is None:
+                    started = time.monotonic()
+                    self.waits += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeoutError(
+                        f'Все {self.max_size} соединений заняты дольше '
+                        f'{self.timeout} с.'
+                    )
+                self.waiting += 1
+                try:
+                    self.condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            if started is not None:
+                self.wait_seconds += time.monotonic() - started
+            connection = self.idle.pop() if self.idle else None
+            if connection is None:
+                self.size += 1
+            self.peak = max(self.peak, self.size - len(self.idle))
+            return connection
+
+    def open(self, connect):
+        try:
+            return connect()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+
+    def put(self, connection, discard=False):
+        with self.condition:
+            discard = discard or self.closed
+            if discard:
+                self.size -= 1
+            else:
+                self.idle.append(connection)
+            self.condition.notify()
+        if discard:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def close(self):
+        """Закрывает свободные соединения, занятые закроются при возврате."""
+        with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, deque()
+            self.size -= len(idle)
+        for connection in idle:
+            connection.close()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'max_size': self.max_size,
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': self.size - len(self.idle),
+                'in_use_peak': self.peak,
+                'waiting': self.waiting,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_seconds': self.wait_seconds,
+            }
+
+
+def get_pool(alias, database, max_size, timeout):
+    key = alias, database
+    with pools_lock:
+        if key not in pools:
+            pools[key] = ConnectionPool(max_size, timeout)
+        return pools[key]
+
+
+def close_pools(alias):
+    with pools_lock:
+        closed = [key for key in pools if key[0] == alias]
+        closed = [pools.pop(key) for key in closed]
+    for pool in closed:
+        pool.close()
+
+
+def pool_stats():
+    """Состояние пулов процесса: {(alias, база): {показатель: значение}}."""
+    with pools_lock:
+        current = dict(pools)
+    return {key: pool.stats() for key, pool in current.items()}
@@ -0,0 +1,135 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions
+
+from foodgram.db.pool import PoolTimeoutError, close_pools, get_pool
+
+Database = base.Database
+
+
+def is_alive(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Database.Error:
+        return False
+    return True
+
+
+def reset(connection):
+    """Готовит соединение к возврату в пул, False - его нужно закрыть."""
+    if connection.closed:
+        return False
+    status = connection.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            connection.rollback()
+        except Database.Error:
+            return False
+    return True
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Соединения из пула не дали бы удалить тестовую базу.
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с проверкой соединений и необязательным пулом.
+
+    CONN_HEALTH_CHECKS: постоянное соединение (CONN_MAX_AGE) проверяется
+    перед первым запросом в каждом HTTP-запросе, как в Django 4.1.
+    OPTIONS['pool'] = {'max_size': ..., 'timeout': ...}: соединения
+    берутся из пула процесса и возвращаются в него после запроса вместо
+    закрытия, как в Django 5.1; с пулом CONN_MAX_AGE должен быть 0.
+    """
+
+    creation_class = DatabaseCreation
+    health_check_done = False
+    connection_pool = None
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        # Служебные соединения Django без базы (создание тестовой базы)
+        # в пул не попадают.
+        if not options or self.alias == NO_DB_ALIAS:
+            return None
+        return get_pool(
+            self.alias, self.settings_dict['NAME'],
+            options.get('max_size', 10), options.get('timeout', 10)
+        )
+
+    def check_settings(self):
+        super().check_settings()
+        if self.pool is not None and self.settings_dict['CONN_MAX_AGE']:
+            raise ImproperlyConfigured(
+                'Пул соединений нельзя сочетать с CONN_MAX_AGE.'
+            )
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        self.connection_pool = pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        try:
+            connection = pool.get(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params
+                ),
+                is_alive if self.health_check_enabled else None
+            )
+        except PoolTimeoutError as error:
+            raise Database.OperationalError(str(error)) from error
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        pool = self.connection_pool
+        if pool is None:
+            return super()._close()
+        # Внутри atomic Django держит ссылку на соединение до выхода из
+        # блока, такое соединение в пул не возвращается.
+        pool.put(
+            self.connection,
+            discard=self.in_atomic_block or not reset(self.connection)
+        )
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # Вызывается в начале и в конце каждого HTTP-запроса.
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
@@ -0,0 +1,10 @@
+import re
+
+PARAMETER_LISTS = re.compile(r'%s(?:, %s)+')
+
+
+def signature(sql):
+    """Текст запроса без значений: IN (%s, %s, ...) с любым числом
+    параметров дает одну сигнатуру.
+    """
+    return PARAMETER_LISTS.sub('%s...', sql)
@@ -0,0 +1,67 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+# Токен только что вошедшего пользователя может еще не дойти до реплики.
+PRIMARY_MODELS = {'authtoken.Token'}
+
+read_alias = ContextVar('read_alias', default=None)
+
+
+@contextmanager
+def read_routing():
+    """Область, в которой use_replica() переключает чтения на реплику."""
+    token = read_alias.set(None)
+    try:
+        yield
+    finally:
+        read_alias.reset(token)
+
+
+def use_replica():
+    """Чтения до конца read_routing() идут на одну случайную реплику."""
+    if settings.REPLICA_DATABASES:
+        read_alias.set(random.choice(settings.REPLICA_DATABASES))
+
+
+def reading_from_replica():
+    return read_alias.get() is not None
+
+
+def primary_key(user_id):
+    return f'db:primary:{user_id}'
+
+
+def pin_to_primary(user):
+    """После записи пользователь читает с основной базы, пока реплики
+    могут не знать о его изменениях.
+    """
+    cache.set(primary_key(user.pk), True, settings.REPLICA_LAG_SECONDS)
+
+
+def pinned_to_primary(user):
+    return user.is_authenticated and cache.get(primary_key(user.pk), False)
+
+
+class ReplicaRouter:
+    """Записи и чтения вне use_replica() - в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is None or model._meta.label in PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему репликацией.
+        return db == DEFAULT_DB_ALIAS
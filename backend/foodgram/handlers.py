@@ -0,0 +1,67 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers import asgi
+from django.db import connections
+
+
+def response_headers(response):
+    headers = []
+    for header, value in response.items():
+        if isinstance(header, str):
+            header = header.encode('ascii')
+        if isinstance(value, str):
+            value = value.encode('latin1')
+        headers.append((bytes(header), bytes(value)))
+    for cookie in response.cookies.values():
+        headers.append(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+        )
+    return headers
+
+
+def close_streaming(response):
+    try:
+        response.close()
+    finally:
+        # Поток ответа завершается, его соединения с базой больше не нужны.
+        connections.close_all()
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """ASGI-обработчик, который отдает потоковые ответы по частям.
+
+    Django 3.2 перебирает потоковый ответ прямо в цикле событий, где ORM
+    недоступен. Здесь каждая часть читается в отдельном потоке ответа и
+    сразу уходит клиенту, ответ не собирается в памяти. Один поток на
+    ответ нужен потому, что курсор базы нельзя передавать между потоками.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            def run(function, *args):
+                return loop.run_in_executor(executor, function, *args)
+
+            end = object()
+            parts = await run(iter, response)
+            try:
+                await send({
+                    'type': 'http.response.start',
+                    'status': response.status_code,
+                    'headers': response_headers(response),
+                })
+                part = await run(next, parts, end)
+                while part is not end:
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+                    part = await run(next, parts, end)
+                await send({'type': 'http.response.body'})
+            finally:
+                await run(close_streaming, response)
@@ -1,4 +1,5 @@
 import os
+from itertools import zip_longest
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -33,11 +34,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'foodgram.db.middleware.PrimaryAfterWriteMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,6 +66,10 @@ TEMPLATES = [
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 
+# Размер пула соединений на процесс; 0 - без пула. Пул и проверка
+# соединений (DB_CONN_HEALTH_CHECKS) работают с DB_ENGINE=foodgram.db.postgresql.
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 0))
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.sqlite3'),
@@ -70,10 +77,80 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default=None),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default=None),
         'HOST': os.getenv('DB_HOST', default=None),
-        'PORT': os.getenv('DB_PORT', default=None)
+        'PORT': os.getenv('DB_PORT', default=None),
+        # С пулом соединения возвращаются в него после каждого запроса.
+        'CONN_MAX_AGE': 0 if DB_POOL_MAX_SIZE else int(
+            os.getenv('DB_CONN_MAX_AGE', default=60)
+        ),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', default='True'
+        ) == 'True',
+        'OPTIONS': {
+            'pool': {
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+            },
+        } if DB_POOL_MAX_SIZE else {},
     }
 }
 
+# Реплики для чтения: хосты (DB_REPLICA_HOSTS) или имена баз
+# (DB_REPLICA_NAMES - например, копия базы SQLite для проверки) через
+# запятую, остальные параметры как у основной базы. На реплики уходят
+# только чтения из replica_read_actions view.
+REPLICA_DATABASES = []
+for number, (host, name) in enumerate(zip_longest(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')),
+    filter(None, os.getenv('DB_REPLICA_NAMES', default='').split(',')),
+), start=1):
+    REPLICA_DATABASES.append(f'replica{number}')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host or DATABASES['default']['HOST'],
+        'NAME': name or DATABASES['default']['NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.db.routers.ReplicaRouter']
+
+# На сколько секунд реплика может отстать: столько после своей записи
+# пользователь читает с основной базы и столько не кэшируются ответы,
+# построенные по реплике после изменения их данных.
+REPLICA_LAG_SECONDS = float(os.getenv('REPLICA_LAG_SECONDS', default=5))
+
+# Версии справочников и токены кэша ответов должны быть видны всем
+# процессам backend, поэтому кэш в памяти процесса (LocMemCache) годится
+# только для одного процесса. По умолчанию кэш в файлах, общий для
+# процессов на одной машине. В RESPONSE_CACHE_ALIAS - закэшированные
+# ответы API.
+RESPONSE_CACHE_ALIAS = 'responses'
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            default=os.path.join(BASE_DIR, 'cache', 'default')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    RESPONSE_CACHE_ALIAS: {
+        'BACKEND': os.getenv(
+            'RESPONSE_CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'RESPONSE_CACHE_LOCATION',
+            default=os.path.join(BASE_DIR, 'cache', 'responses')
+        ),
+        'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=86400)),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -109,6 +186,19 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Потоки для создания миниатюр картинок рецептов; 0 - создавать сразу.
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+# Чтения рецептов и справочников выполняются в пуле потоков; включается
+# в foodgram/asgi.py, под WSGI не нужно.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+# Доля запросов, у которых считаются SQL-запросы (0..1), порог медленного
+# запроса для лога и токен для /api/metrics/ (пустой - метрики закрыты).
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0.1))
+METRICS_SLOW_REQUEST_MS = int(os.getenv('METRICS_SLOW_REQUEST_MS', 500))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
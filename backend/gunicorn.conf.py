@@ -0,0 +1,17 @@
+import os
+
+# SERVER_MODE=wsgi - синхронные воркеры gunicorn, как раньше;
+# SERVER_MODE=asgi - воркеры uvicorn: один процесс обслуживает много
+# медленных клиентов, чтения рецептов и справочников идут в пуле потоков.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
+    worker_class = 'sync'
+
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
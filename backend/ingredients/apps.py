@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class IngredientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ingredients'
     verbose_name = 'Ингредиенты'
+
+    def ready(self):
+        from .catalog import INGREDIENTS
+        from .models import Ingredient
+
+        post_save.connect(INGREDIENTS.invalidate, sender=Ingredient)
+        post_delete.connect(INGREDIENTS.invalidate, sender=Ingredient)
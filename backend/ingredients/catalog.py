@@ -0,0 +1,3 @@
+from foodgram.catalogs import Catalog
+
+INGREDIENTS = Catalog('ingredients.Ingredient', ('name', 'measurement_unit'))
@@ -0,0 +1,75 @@
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from ingredients.models import Ingredient
+from ingredients.search import AUTOCOMPLETE_LIMIT, autocomplete
+
+DEFAULT_PATH = Path(settings.BASE_DIR).parent / 'data' / 'ingredients.json'
+
+
+def search_fields_lookup(query):
+    # То, что делал SearchFilter с search_fields = ('^name', 'name').
+    return list(Ingredient.objects.filter(
+        Q(name__istartswith=query) | Q(name__icontains=query)
+    ))
+
+
+def autocomplete_lookup(query):
+    return autocomplete(query, AUTOCOMPLETE_LIMIT)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость автодополнения ингредиентов с поиском '
+        'через SearchFilter на запросах из data/ingredients.json.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH,
+                            type=Path)
+        parser.add_argument('--queries', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not Ingredient.objects.exists():
+            raise CommandError(
+                'Таблица ингредиентов пуста, сначала выполните '
+                'load_ingredients.'
+            )
+        with options['path'].open(encoding='utf-8') as file:
+            names = [item['name'] for item in json.load(file)]
+        queries = self.make_queries(names, options['queries'], options['seed'])
+
+        autocomplete_lookup(queries[0])
+        for title, lookup in (
+            ('SearchFilter', search_fields_lookup),
+            ('autocomplete', autocomplete_lookup),
+        ):
+            timings = []
+            for query in queries:
+                started = time.perf_counter()
+                lookup(query)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{title:>12}: запросов {len(timings)}, '
+                f'p50 {statistics.median(timings):.3f} мс, '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:.3f} мс, '
+                f'max {timings[-1]:.3f} мс'
+            )
+
+    def make_queries(self, names, count, seed):
+        generator = random.Random(seed)
+        queries = []
+        for _ in range(count):
+            name = generator.choice(names)
+            start = generator.choice((0, 0, 0, generator.randrange(len(name))))
+            queries.append(name[start:start + generator.randint(1, 4)])
+        return queries
@@ -0,0 +1,125 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ingredients.catalog import INGREDIENTS
+from ingredients.models import Ingredient
+
+DEFAULT_PATH = Path(settings.BASE_DIR).parent / 'data' / 'ingredients.json'
+READ_SIZE = 64 * 1024
+
+
+class JSONArrayReader:
+    """Читает JSON-массив объектов по одному элементу, не загружая файл."""
+
+    def __init__(self, file):
+        self.file = file
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+
+    def __iter__(self):
+        if self.next_char() != '[':
+            raise CommandError('Ожидался JSON-массив ингредиентов.')
+        self.position += 1
+        while self.next_char() != ']':
+            yield self.decode()
+            if self.next_char() == ',':
+                self.position += 1
+
+    def next_char(self):
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position].isspace()
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read():
+                raise CommandError('Неожиданный конец JSON-файла.')
+
+    def decode(self):
+        while True:
+            try:
+                item, self.position = self.decoder.raw_decode(
+                    self.buffer, self.position
+                )
+            except json.JSONDecodeError:
+                if not self.read():
+                    raise
+            else:
+                return item
+
+    def read(self):
+        chunk = self.file.read(READ_SIZE)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return chunk
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV- или JSON-файла.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=DEFAULT_PATH,
+            type=Path,
+            help='Файл с ингредиентами (.csv или .json).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одном INSERT.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path.suffix not in ('.csv', '.json'):
+            raise CommandError('Поддерживаются только файлы .csv и .json.')
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден.')
+
+        started = time.monotonic()
+        before = Ingredient.objects.count()
+        read = 0
+        with path.open(encoding='utf-8', newline='') as file:
+            rows = iter(
+                read_csv(file) if path.suffix == '.csv'
+                else JSONArrayReader(file)
+            )
+            while True:
+                batch = [
+                    Ingredient(
+                        name=row['name'].strip(),
+                        measurement_unit=row['measurement_unit'].strip()
+                    )
+                    for row in islice(rows, options['batch_size'])
+                ]
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                read += len(batch)
+        created = Ingredient.objects.count() - before
+        if created:
+            INGREDIENTS.invalidate()
+        elapsed = max(time.monotonic() - started, 1e-6)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {read}, добавлено ингредиентов: {created}, '
+            f'время: {elapsed:.2f} с ({read / elapsed:.0f} строк/с).'
+        ))
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ingredient_name_prefix_idx '
+    'ON ingredients_ingredient (UPPER(name) varchar_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx '
+    'ON ingredients_ingredient USING gin (UPPER(name) gin_trgm_ops)',
+)
+
+
+def create_indexes(apps, schema_editor):
+    # istartswith/icontains на PostgreSQL превращаются в
+    # UPPER(name) LIKE ..., поэтому индексы строятся по UPPER(name).
+    # На остальных СУБД поиск идет по индексу в памяти процесса.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for sql in INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_prefix_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredients', '0002_unique_ingredient_unit'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
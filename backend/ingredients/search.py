@@ -0,0 +1,67 @@
+from bisect import bisect_left
+
+from django.db import connection
+
+from .catalog import INGREDIENTS
+from .models import Ingredient
+
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_MAX_LIMIT = 100
+
+
+class IngredientIndex:
+    """Ингредиенты, отсортированные по названию, для поиска по префиксу."""
+
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda row: (row[1].lower(), row[0]))
+        self.names = [row[1].lower() for row in self.rows]
+
+    def search(self, query, limit):
+        query = query.lower()
+        found = []
+        position = bisect_left(self.names, query)
+        while (
+            len(found) < limit
+            and position < len(self.names)
+            and self.names[position].startswith(query)
+        ):
+            found.append(self.rows[position])
+            position += 1
+        if len(found) < limit:
+            for row, name in zip(self.rows, self.names):
+                if query in name and not name.startswith(query):
+                    found.append(row)
+                    if len(found) == limit:
+                        break
+        return found
+
+
+def get_index():
+    return INGREDIENTS.derive('autocomplete', lambda items: IngredientIndex(
+        (pk, name, measurement_unit)
+        for pk, (name, measurement_unit) in items.items()
+    ))
+
+
+def search_database(query, limit):
+    found = list(Ingredient.objects.filter(name__istartswith=query)[:limit])
+    if len(found) < limit:
+        found.extend(
+            Ingredient.objects.filter(
+                name__icontains=query
+            ).exclude(
+                name__istartswith=query
+            )[:limit - len(found)]
+        )
+    return found
+
+
+def autocomplete(query, limit=AUTOCOMPLETE_LIMIT):
+    """Сначала ингредиенты, начинающиеся с query, затем содержащие его."""
+    limit = min(limit, AUTOCOMPLETE_MAX_LIMIT)
+    if connection.vendor == 'postgresql':
+        return search_database(query, limit)
+    return [
+        Ingredient(id=pk, name=name, measurement_unit=measurement_unit)
+        for pk, name, measurement_unit in get_index().search(query, limit)
+    ]
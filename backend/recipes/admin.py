@@ -1,6 +1,9 @@
 from django.contrib import admin
 
-from .models import AmountIngredient, FavoriteRecipe, Recipe, ShoppingList
+from .images import schedule_thumbnails
+from .models import (AmountIngredient, FavoriteRecipe, Recipe, ShoppingList,
+                     ShoppingListIngredient, amount_deltas, recipe_amounts)
+from .search import delete_from_search_index, update_search_index
 
 
 class AmountIngredientInline(admin.TabularInline):
@@ -23,8 +26,38 @@ class RecipeAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
     def in_favorites(self, instance):
-        return instance.favorite_recipes.count()
+        return instance.favorites_count
     in_favorites.short_description = 'добавлен в избранное'
+    in_favorites.admin_order_field = 'favorites_count'
+
+    def save_model(self, request, obj, form, change):
+        if 'image' in form.changed_data:
+            obj.has_thumbnails = False
+        super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            schedule_thumbnails(obj.image.name)
+
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        amounts = recipe_amounts(recipe) if change else {}
+        super().save_related(request, form, formsets, change)
+        new_amounts = recipe_amounts(recipe)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            ingredients_count=len(new_amounts)
+        )
+        if change:
+            ShoppingListIngredient.objects.change_recipe(
+                recipe, amount_deltas(amounts, new_amounts)
+            )
+        update_search_index([recipe.pk])
+
+    def delete_model(self, request, obj):
+        delete_from_search_index([obj.pk])
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        delete_from_search_index(queryset.values_list('pk', flat=True))
+        super().delete_queryset(request, queryset)
 
 
 class ShoppingListAdmin(admin.ModelAdmin):
@@ -36,6 +69,26 @@ class ShoppingListAdmin(admin.ModelAdmin):
     search_fields = ('user',)
     empty_value_display = '-пусто-'
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            old = ShoppingList.objects.get(pk=obj.pk)
+            ShoppingListIngredient.objects.remove_recipe(
+                old.user, old.recipe_id
+            )
+        super().save_model(request, obj, form, change)
+        ShoppingListIngredient.objects.add_recipe(obj.user, obj.recipe_id)
+
+    def delete_model(self, request, obj):
+        ShoppingListIngredient.objects.remove_recipe(obj.user, obj.recipe_id)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for item in queryset.select_related('user'):
+            ShoppingListIngredient.objects.remove_recipe(
+                item.user, item.recipe_id
+            )
+        super().delete_queryset(request, queryset)
+
 
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = (
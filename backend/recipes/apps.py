@@ -5,3 +5,12 @@ class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals
+        from .search import install
+
+        post_migrate.connect(install, sender=self)
+        signals.connect()
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+
+from ingredients.models import Ingredient
+from tags.models import Tag
+from users.models import Follow
+
+from .models import Recipe
+from .synthetic import WORDS
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+User = get_user_model()
+
+
+def percentile(values, share):
+    """Перцентиль по отсортированному списку values."""
+    return values[max(int(len(values) * share) - 1, 0)]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # На Linux ru_maxrss в килобайтах.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def benchmark_user(username=None):
+    """Пользователь username, по умолчанию - с наибольшим числом подписок:
+    у него самые тяжелые подписки и лента. None, если такого нет.
+    """
+    if username:
+        return User.objects.filter(username=username).first()
+    busiest = Follow.objects.values('user').annotate(
+        total=Count('id')
+    ).order_by('-total', 'user').first()
+    if busiest is None:
+        return None
+    return User.objects.get(pk=busiest['user'])
+
+
+def endpoint_cases(generator, user):
+    """Основные эндпоинты API: {сценарий: функция, возвращающая URL}.
+
+    Параметры выбираются через generator; None, если в базе нет рецептов.
+    """
+    recipes = list(Recipe.objects.values_list('id', flat=True)[:1000])
+    tags = list(Tag.objects.values_list('slug', flat=True))
+    ingredients = list(Ingredient.objects.values_list('id', 'name')[:500])
+    if not recipes or not ingredients:
+        return None
+    authors = list(Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    )) or [user.pk]
+
+    def tags_query():
+        chosen = generator.sample(tags, min(len(tags), 2))
+        return '&'.join(f'tags={slug}' for slug in chosen)
+
+    return {
+        'recipes': lambda: '/api/recipes/',
+        'recipes_page': lambda: (
+            f'/api/recipes/?page={generator.randint(2, 20)}'
+        ),
+        'recipes_tags': lambda: f'/api/recipes/?{tags_query()}',
+        'recipes_author': lambda: (
+            f'/api/recipes/?author={generator.choice(authors)}'
+        ),
+        'recipes_favorited': lambda: '/api/recipes/?is_favorited=1',
+        'recipes_search': lambda: (
+            f'/api/recipes/?search={generator.choice(WORDS)}'
+        ),
+        'recipes_have': lambda: '/api/recipes/?have=' + ','.join(
+            str(pk) for pk, _ in generator.sample(ingredients, 5)
+        ),
+        'recipe_detail': lambda: (
+            f'/api/recipes/{generator.choice(recipes)}/'
+        ),
+        'download_shopping_cart': lambda: (
+            '/api/recipes/download_shopping_cart/'
+        ),
+        'subscriptions': lambda: (
+            '/api/users/subscriptions/?recipes_limit=3'
+        ),
+        'feed': lambda: '/api/recipes/feed/',
+        'ingredients_search': lambda: '/api/ingredients/?name={}'.format(
+            generator.choice(ingredients)[1][:3]
+        ),
+    }
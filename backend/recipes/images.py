@@ -0,0 +1,138 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = {
+    'small': (320, 320),
+    'medium': (800, 800),
+}
+THUMBNAIL_FORMAT, THUMBNAIL_EXTENSION = (
+    ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+)
+THUMBNAIL_DIR = 'recipes/thumbnails'
+
+# Отправляется, когда рецепты с картинкой name получили миниатюры.
+thumbnails_created = Signal()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, где имя файла - хэш содержимого.
+
+    Если файл с таким именем уже есть, он не перезаписывается и не
+    копируется под новым именем: одинаковые картинки хранятся один раз.
+    """
+
+    def save(self, name, content, max_length=None):
+        try:
+            if name is not None and self.exists(name):
+                return name
+            return super().save(name, content, max_length)
+        finally:
+            # Временный файл загрузки либо перемещен в хранилище, либо
+            # больше не нужен.
+            if hasattr(content, 'temporary_file_path'):
+                content.close()
+
+
+image_storage = ContentAddressedStorage()
+
+
+def thumbnail_name(name, size):
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    return f'{THUMBNAIL_DIR}/{stem}-{size}.{THUMBNAIL_EXTENSION}'
+
+
+def thumbnail_urls(name, sizes=THUMBNAIL_SIZES):
+    """{размер: url} миниатюр картинки.
+
+    Имена выводятся из имени картинки без обращения к хранилищу; созданы
+    ли миниатюры, говорит Recipe.has_thumbnails.
+    """
+    if not name:
+        return {}
+    return {
+        size: image_storage.url(thumbnail_name(name, size))
+        for size in sizes
+    }
+
+
+def render_thumbnail(image, box):
+    thumbnail = image.copy()
+    thumbnail.thumbnail(box)
+    if THUMBNAIL_FORMAT == 'JPEG' and thumbnail.mode != 'RGB':
+        thumbnail = thumbnail.convert('RGB')
+    buffer = BytesIO()
+    thumbnail.save(buffer, THUMBNAIL_FORMAT, quality=80)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_thumbnails(name):
+    missing = {
+        size: thumbnail_name(name, size) for size in THUMBNAIL_SIZES
+        if not image_storage.exists(thumbnail_name(name, size))
+    }
+    if missing:
+        with image_storage.open(name) as file, Image.open(file) as image:
+            image = ImageOps.exif_transpose(image)
+            for size, thumbnail in missing.items():
+                image_storage.save(
+                    thumbnail, render_thumbnail(image, THUMBNAIL_SIZES[size])
+                )
+    # Картинка могла быть загружена раньше другим рецептом, тогда
+    # миниатюры уже есть и нужно только отметить новые рецепты.
+    marked = apps.get_model('recipes.Recipe').objects.filter(
+        image=name, has_thumbnails=False
+    ).update(has_thumbnails=True)
+    if marked:
+        thumbnails_created.send(sender=generate_thumbnails, name=name)
+
+
+executor = None
+executor_lock = Lock()
+
+
+def get_executor():
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+    return executor
+
+
+def run_in_worker(name):
+    try:
+        generate_thumbnails(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        connection.close()
+
+
+def schedule_thumbnails(name):
+    """Создает миниатюры после фиксации транзакции в фоновом потоке.
+
+    При IMAGE_WORKERS = 0 миниатюры создаются сразу в текущем потоке.
+    """
+    if not name:
+        return
+    if settings.IMAGE_WORKERS:
+        transaction.on_commit(lambda: get_executor().submit(
+            run_in_worker, name
+        ))
+    else:
+        transaction.on_commit(lambda: generate_thumbnails(name))
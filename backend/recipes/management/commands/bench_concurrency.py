@@ -0,0 +1,153 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Event, Thread, local
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from recipes.benchmarks import benchmark_user, percentile
+
+PATHS = (
+    '/api/recipes/',
+    '/api/recipes/feed/',
+    '/api/recipes/?search=суп',
+    '/api/tags/',
+    '/api/ingredients/?name=сол',
+    '/api/recipes/download_shopping_cart/',
+)
+
+
+def server_connections():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            # Параллельные воркеры запросов max_connections не занимают.
+            "SELECT count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() "
+            "AND backend_type = 'client backend' "
+            "AND pid <> pg_backend_pid()"
+        )
+        return cursor.fetchone()[0]
+
+
+class ConnectionSampler(Thread):
+    """Наибольшее число соединений с Postgres за время замера: по нему
+    подбираются число воркеров и DB_POOL_MAX_SIZE под max_connections.
+    """
+
+    interval = 0.05
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.stopped = Event()
+        self.peak = 0
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                self.peak = max(self.peak, server_connections())
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return self.peak
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный backend параллельными клиентами и замеряет '
+        'пропускную способность и время ответа. Запускается по очереди '
+        'против SERVER_MODE=wsgi и SERVER_MODE=asgi на одной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, nargs='+',
+                            default=[1, 8, 32])
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на каждый уровень параллельности.')
+        parser.add_argument('--paths', nargs='+', default=PATHS)
+        parser.add_argument('--user', help='Имя пользователя для запросов.')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', type=Path,
+                            help='Куда сохранить результат в JSON.')
+
+    def handle(self, *args, **options):
+        user = benchmark_user(options['user'])
+        if user is None:
+            raise CommandError('Нет пользователя для запросов, сначала '
+                               'выполните seed_synthetic.')
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {'Authorization': f'Token {token.key}'}
+        sessions = local()
+        paths = options['paths']
+
+        def fetch(number):
+            if not hasattr(sessions, 'session'):
+                sessions.session = requests.Session()
+                sessions.session.headers.update(headers)
+            started = time.perf_counter()
+            try:
+                response = sessions.session.get(
+                    options['url'] + paths[number % len(paths)],
+                    timeout=options['timeout']
+                )
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            return ok, (time.perf_counter() - started) * 1000
+
+        postgres = connection.vendor == 'postgresql'
+        if postgres:
+            with connection.cursor() as cursor:
+                cursor.execute('SHOW max_connections')
+                self.stdout.write(
+                    f'Postgres max_connections: {cursor.fetchone()[0]}'
+                )
+            # Считаются только соединения backend.
+            connection.close()
+        results = {}
+        for concurrency in options['concurrency']:
+            results[concurrency] = self.measure(
+                fetch, concurrency, options['requests'], postgres
+            )
+            if results[concurrency] is None:
+                raise CommandError(f'{options["url"]} не отвечает.')
+        if options['output']:
+            options['output'].write_text(
+                json.dumps(results, ensure_ascii=False, indent=2),
+                encoding='utf-8'
+            )
+
+    def measure(self, fetch, concurrency, total, postgres):
+        sampler = ConnectionSampler() if postgres else None
+        if sampler:
+            sampler.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            measured = list(executor.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+        connections = sampler.stop() if sampler else None
+        timings = sorted(timing for ok, timing in measured if ok)
+        if not timings:
+            return None
+        result = {
+            'rps': round(len(measured) / elapsed, 1),
+            'p50_ms': round(statistics.median(timings), 1),
+            'p95_ms': round(percentile(timings, 0.95), 1),
+            'errors': len(measured) - len(timings),
+            'db_connections': connections,
+        }
+        self.stdout.write(
+            f'{concurrency:>4} клиентов: {result["rps"]:7.1f} запросов/с, '
+            f'p50 {result["p50_ms"]:7.1f} мс, '
+            f'p95 {result["p95_ms"]:7.1f} мс, ошибок {result["errors"]}'
+            + (f', соединений с БД {connections}' if postgres else '')
+        )
+        return result
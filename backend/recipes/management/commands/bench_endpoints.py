@@ -0,0 +1,163 @@
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from recipes.benchmarks import (benchmark_user, endpoint_cases, peak_rss_mb,
+                                percentile)
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95 времени ответа, число SQL-запросов и пиковую '
+        'память на основных эндпоинтах API. Результат можно сохранить '
+        'в JSON и сравнить с базовым.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на каждый сценарий.')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--user', help='Имя пользователя для запросов.')
+        parser.add_argument('--only', nargs='+', metavar='CASE',
+                            help='Запустить только эти сценарии.')
+        parser.add_argument('--output', type=Path,
+                            help='Куда сохранить результат в JSON.')
+        parser.add_argument('--baseline', type=Path,
+                            help='JSON прошлого запуска для сравнения.')
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='Ошибка, если p95 вырос больше чем на столько процентов '
+                 'или стало больше SQL-запросов.'
+        )
+
+    def get_user(self, username):
+        user = benchmark_user(username)
+        if user is None:
+            raise CommandError(
+                f'Пользователь {username} не найден.' if username else
+                'Нет подписок, сначала выполните seed_synthetic.'
+            )
+        return user
+
+    def measure(self, client, url, warmup, requests):
+        for _ in range(warmup):
+            self.fetch(client, url())
+        timings = []
+        queries = []
+        for _ in range(requests):
+            counter = QueryCounter()
+            path = url()
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                self.fetch(client, path)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count)
+        timings.sort()
+        return {
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'queries': max(queries),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+    def fetch(self, client, path):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path}: ответ {response.status_code}.')
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        cases = endpoint_cases(generator, user)
+        if cases is None:
+            raise CommandError(
+                'Нет рецептов, сначала выполните seed_synthetic.'
+            )
+        if options['only']:
+            unknown = set(options['only']) - cases.keys()
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные сценарии: {", ".join(sorted(unknown))}.'
+                )
+            cases = {name: cases[name] for name in options['only']}
+        result = {
+            'database': connection.vendor,
+            'recipes': Recipe.objects.count(),
+            'users': User.objects.count(),
+            'user': user.username,
+            'requests': options['requests'],
+            'cases': {},
+        }
+        self.stdout.write(
+            f'{result["database"]}: рецептов {result["recipes"]}, '
+            f'пользователей {result["users"]}, запросы от {user.username}'
+        )
+        for name, url in cases.items():
+            result['cases'][name] = measured = self.measure(
+                client, url, options['warmup'], options['requests']
+            )
+            self.stdout.write(
+                f'{name:>24}: p50 {measured["p50_ms"]:8.2f} мс, '
+                f'p95 {measured["p95_ms"]:8.2f} мс, '
+                f'SQL {measured["queries"]:3}, '
+                f'RSS {measured["peak_rss_mb"] or 0:.0f} МБ'
+            )
+        if options['output']:
+            options['output'].write_text(
+                json.dumps(result, ensure_ascii=False, indent=2),
+                encoding='utf-8'
+            )
+        if options['baseline']:
+            self.compare(
+                result, options['baseline'], options['max_regression']
+            )
+
+    def compare(self, result, path, max_regression):
+        baseline = json.loads(path.read_text(encoding='utf-8'))['cases']
+        regressions = []
+        self.stdout.write(f'Сравнение с {path}:')
+        for name, measured in result['cases'].items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            change = (
+                (measured['p95_ms'] - before['p95_ms'])
+                / max(before['p95_ms'], 1e-6) * 100
+            )
+            queries = measured['queries'] - before['queries']
+            self.stdout.write(
+                f'{name:>24}: p50 {before["p50_ms"]:.2f} -> '
+                f'{measured["p50_ms"]:.2f} мс, p95 {change:+.0f}%, '
+                f'SQL {queries:+d}'
+            )
+            if max_regression is not None and (
+                change > max_regression or queries > 0
+            ):
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f'Регрессии: {", ".join(regressions)}.')
@@ -0,0 +1,95 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from ingredients.models import Ingredient
+from recipes.models import Recipe
+from recipes.search import get_index, search_recipes
+from recipes.synthetic import WORDS, generate_recipes, get_or_create_authors
+
+PAGE_SIZE = 6
+
+
+def icontains_lookup(query):
+    # Наивный поиск, который пришлось бы делать без индекса.
+    return list(Recipe.objects.filter(
+        Q(name__icontains=query)
+        | Q(text__icontains=query)
+        | Q(ingredients__name__icontains=query)
+    ).distinct()[:PAGE_SIZE])
+
+
+def index_lookup(query):
+    return list(search_recipes(Recipe.objects.all(), query)[:PAGE_SIZE])
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает полнотекстовый поиск рецептов с icontains. '
+        'С --generate сначала создает синтетические рецепты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--generate', type=int, default=0,
+                            help='Сколько синтетических рецептов создать.')
+        parser.add_argument('--authors', type=int, default=100)
+        parser.add_argument('--queries', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if get_index() is None:
+            raise CommandError(
+                'База данных не поддерживает полнотекстовый индекс.'
+            )
+        if options['generate']:
+            started = time.perf_counter()
+            try:
+                created = generate_recipes(
+                    get_or_create_authors(options['authors']),
+                    options['generate'],
+                    seed=options['seed']
+                )
+            except ValueError as error:
+                raise CommandError(error)
+            self.stdout.write(
+                f'Создано рецептов: {created} за '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+        self.stdout.write(f'Рецептов в базе: {Recipe.objects.count()}')
+        generator = random.Random(options['seed'])
+        ingredients = list(Ingredient.objects.values_list('name', flat=True))
+        groups = {
+            'частые слова': [
+                generator.choice(WORDS) for _ in range(options['queries'])
+            ],
+            'ингредиенты': [
+                generator.choice(ingredients)
+                for _ in range(options['queries'] if ingredients else 0)
+            ],
+        }
+        for group, queries in groups.items():
+            if not queries:
+                continue
+            self.stdout.write(f'{group}:')
+            for title, lookup in (
+                ('icontains', icontains_lookup),
+                ('search', index_lookup),
+            ):
+                self.report(title, lookup, queries)
+
+    def report(self, title, lookup, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            lookup(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'{title:>12}: запросов {len(timings)}, '
+            f'p50 {statistics.median(timings):.2f} мс, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} мс, '
+            f'max {timings[-1]:.2f} мс'
+        )
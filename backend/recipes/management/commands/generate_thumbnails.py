@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import generate_thumbnails
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создает недостающие миниатюры для картинок всех рецептов.'
+
+    def handle(self, *args, **options):
+        names = Recipe.objects.order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        failed = 0
+        for name in names.iterator():
+            try:
+                generate_thumbnails(name)
+            except OSError as error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинки обработаны, ошибок: {failed}.'
+        ))
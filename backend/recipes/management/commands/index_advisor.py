@@ -0,0 +1,180 @@
+import json
+import random
+import re
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from foodgram.db.queries import signature
+from recipes.benchmarks import benchmark_user, endpoint_cases
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+# Псевдонимы таблиц в SQL Django: FROM "recipes_recipe_tags" U0.
+TABLE_ALIAS = re.compile(r'"(\w+)" (\w+)')
+
+
+class QueryLog:
+    """SELECT-запросы сценария по базам, по одному на сигнатуру."""
+
+    def __init__(self):
+        self.queries = {}
+
+    def wrapper(self, alias):
+        def record(execute, sql, params, many, context):
+            if not many and sql.lstrip().upper().startswith('SELECT'):
+                self.queries.setdefault(
+                    (alias, signature(sql)), (sql, params)
+                )
+            return execute(sql, params, many, context)
+        return record
+
+
+class PostgresPlans:
+    def seq_scans(self, cursor, sql, params):
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node['Node Type'] == 'Seq Scan':
+                yield node['Relation Name']
+            nodes.extend(node.get('Plans', ()))
+
+    def table_rows(self, cursor, table):
+        # Оценка планировщика; у таблицы без ANALYZE ее нет.
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [table]
+        )
+        rows = cursor.fetchone()[0]
+        if rows < 0:
+            cursor.execute(f'SELECT count(*) FROM "{table}"')
+            rows = cursor.fetchone()[0]
+        return rows
+
+
+class SQLitePlans:
+    def seq_scans(self, cursor, sql, params):
+        # Полный проход по индексу (SCAN ... USING INDEX) - это чтение в
+        # порядке индекса, обычно до LIMIT; отмечается только SCAN таблицы.
+        # Новые версии SQLite пишут в плане псевдоним вместо таблицы.
+        aliases = {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        for *_, detail in cursor.fetchall():
+            match = SQLITE_SCAN.match(detail)
+            if match:
+                yield aliases.get(match.group(1), match.group(1))
+
+    def table_rows(self, cursor, table):
+        cursor.execute(f'SELECT count(*) FROM "{table}"')
+        return cursor.fetchone()[0]
+
+
+PLANS = {
+    'postgresql': PostgresPlans,
+    'sqlite': SQLitePlans,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет запросы основных эндпоинтов API с EXPLAIN и отмечает '
+        'полные проходы по таблицам больше --min-rows строк.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-rows', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--user', help='Имя пользователя для запросов.')
+        parser.add_argument('--only', nargs='+', metavar='CASE',
+                            help='Проверить только эти сценарии.')
+        parser.add_argument(
+            '--allow', nargs='+', default=[], metavar='CASE:TABLE',
+            help='Ожидаемые полные проходы, например recipes:recipes_recipe.'
+        )
+        parser.add_argument('--fail', action='store_true',
+                            help='Ошибка, если найдены полные проходы.')
+
+    def handle(self, *args, **options):
+        user = benchmark_user(options['user'])
+        if user is None:
+            raise CommandError('Нет пользователя для запросов, сначала '
+                               'выполните seed_synthetic.')
+        cases = endpoint_cases(random.Random(options['seed']), user)
+        if cases is None:
+            raise CommandError(
+                'Нет рецептов, сначала выполните seed_synthetic.'
+            )
+        if options['only']:
+            cases = {name: cases[name] for name in options['only']
+                     if name in cases}
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.sizes = {}
+        found = []
+        for name, url in cases.items():
+            log = self.replay(client, url())
+            scans = [
+                (table, rows, sql)
+                for table, rows, sql in self.seq_scans(
+                    log, options['min_rows']
+                )
+                if f'{name}:{table}' not in options['allow']
+            ]
+            self.report(name, len(log.queries), scans)
+            found += [(name, table) for table, _, _ in scans]
+        if found and options['fail']:
+            raise CommandError('Полные проходы: {}.'.format(', '.join(
+                f'{name}:{table}' for name, table in found
+            )))
+
+    def replay(self, client, path):
+        log = QueryLog()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(log.wrapper(connection.alias))
+                )
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        if response.status_code != 200:
+            raise CommandError(f'{path}: ответ {response.status_code}.')
+        return log
+
+    def seq_scans(self, log, min_rows):
+        for (alias, _), (sql, params) in log.queries.items():
+            connection = connections[alias]
+            plans = PLANS.get(connection.vendor)
+            if plans is None:
+                raise CommandError(
+                    f'EXPLAIN для {connection.vendor} не поддерживается.'
+                )
+            with connection.cursor() as cursor:
+                # В плане SQLite так же выглядят и подзапросы во FROM.
+                tables = set(plans().seq_scans(cursor, sql, params)) & set(
+                    connection.introspection.table_names(cursor)
+                )
+                for table in tables:
+                    if (alias, table) not in self.sizes:
+                        self.sizes[alias, table] = plans().table_rows(
+                            cursor, table
+                        )
+                    if self.sizes[alias, table] >= min_rows:
+                        yield table, self.sizes[alias, table], sql
+
+    def report(self, name, queries, scans):
+        if not scans:
+            self.stdout.write(f'{name:>24}: SQL {queries:3}, без полных '
+                              f'проходов')
+            return
+        self.stdout.write(self.style.WARNING(
+            f'{name:>24}: SQL {queries:3}, полных проходов {len(scans)}'
+        ))
+        for table, rows, sql in scans:
+            self.stdout.write(f'{"":>26}{table} (~{rows} строк): {sql[:200]}')
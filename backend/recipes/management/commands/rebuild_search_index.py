@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.search import get_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит полнотекстовый индекс рецептов, например после '
+        'переименования ингредиентов или правок в обход API.'
+    )
+
+    def handle(self, *args, **options):
+        if get_index() is None:
+            raise CommandError(
+                'База данных не поддерживает полнотекстовый индекс, поиск '
+                'работает без него.'
+            )
+        total = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано рецептов: {total}.'
+        ))
@@ -0,0 +1,73 @@
+from collections import defaultdict
+from itertools import chain
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingListIngredient
+
+# Сколько пользователей пересчитывать за раз: список в IN (...) не должен
+# упираться в предел параметров SQLite (999 в старых версиях).
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет агрегированные списки покупок с рецептами в корзинах '
+        'и пересчитывает расходящиеся.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить списки, ничего не изменяя.'
+        )
+
+    def handle(self, *args, **options):
+        expected = {
+            (user, ingredient): amount
+            for user, ingredient, amount
+            in ShoppingListIngredient.objects.totals_from_carts().iterator()
+        }
+        stored = {
+            (user, ingredient): amount
+            for user, ingredient, amount
+            in ShoppingListIngredient.objects.values_list(
+                'user', 'ingredient', 'amount'
+            ).iterator()
+        }
+        users = {
+            user for user, ingredient in expected.keys() | stored.keys()
+            if expected.get((user, ingredient)) != stored.get(
+                (user, ingredient)
+            )
+        }
+        if options['check']:
+            if users:
+                raise CommandError(
+                    f'Списки покупок расходятся у пользователей: {len(users)}.'
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+
+        rows = defaultdict(list)
+        for (user, ingredient), amount in expected.items():
+            if user in users:
+                rows[user].append(ShoppingListIngredient(
+                    user_id=user, ingredient_id=ingredient, amount=amount
+                ))
+        users = sorted(users)
+        for start in range(0, len(users), BATCH_SIZE):
+            batch = users[start:start + BATCH_SIZE]
+            with transaction.atomic():
+                ShoppingListIngredient.objects.filter(
+                    user__in=batch
+                ).delete()
+                ShoppingListIngredient.objects.bulk_create(
+                    chain.from_iterable(rows[user] for user in batch),
+                    batch_size=1000
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны списки покупок пользователей: {len(users)}.'
+        ))
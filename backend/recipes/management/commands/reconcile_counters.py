@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import (AmountIngredient, FavoriteRecipe, Recipe,
+                            ShoppingList)
+from users.models import Follow
+
+User = get_user_model()
+
+# Сколько строк исправлять одним UPDATE: список id в IN (...) не должен
+# упираться в предел параметров SQLite (999 в старых версиях).
+BATCH_SIZE = 500
+
+
+def count_of(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+    (Recipe, 'shopping_carts_count', ShoppingList, 'recipe'),
+    (Recipe, 'ingredients_count', AmountIngredient, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счетчики избранного, списков покупок, ингредиентов, '
+        'рецептов и подписчиков с таблицами связей и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счетчики, ничего не изменяя.'
+        )
+
+    def handle(self, *args, **options):
+        drift = 0
+        for model, counter, related, field in COUNTERS:
+            stale = model.objects.annotate(
+                actual=count_of(related, field)
+            ).exclude(**{counter: F('actual')})
+            if options['check']:
+                found = stale.count()
+            else:
+                found = self.fix(model, counter, list(
+                    stale.values_list('pk', flat=True)
+                ), count_of(related, field))
+            drift += found
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}.{counter}: '
+                f'расхождений {found}'
+            )
+        if options['check'] and drift:
+            raise CommandError(f'Найдено расхождений: {drift}.')
+        self.stdout.write(self.style.SUCCESS(
+            'Расхождений нет.' if options['check'] else
+            f'Исправлено счетчиков: {drift}.'
+        ))
+
+    def fix(self, model, counter, ids, actual):
+        fixed = 0
+        for start in range(0, len(ids), BATCH_SIZE):
+            with transaction.atomic():
+                fixed += model.objects.filter(
+                    pk__in=ids[start:start + BATCH_SIZE]
+                ).update(**{counter: actual})
+        return fixed
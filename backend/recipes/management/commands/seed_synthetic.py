@@ -0,0 +1,75 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from ingredients.models import Ingredient
+from recipes.models import FavoriteRecipe, Recipe, ShoppingList
+from recipes.synthetic import (generate_links, generate_recipes,
+                               get_or_create_authors)
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, рецептами, '
+        'подписками, избранным и корзинами для нагрузочных тестов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--authors', type=int, default=200,
+                            help='Сколько первых пользователей пишут рецепты.')
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--follows', type=float, default=20,
+                            help='Подписок на пользователя в среднем.')
+        parser.add_argument('--favorites', type=float, default=10,
+                            help='Рецептов в избранном в среднем.')
+        parser.add_argument('--carts', type=float, default=3,
+                            help='Рецептов в корзине в среднем.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def step(self, title, action):
+        started = time.perf_counter()
+        result = action()
+        self.stdout.write(
+            f'{title}: {result} за {time.perf_counter() - started:.1f} с'
+        )
+
+    def handle(self, *args, **options):
+        if options['authors'] > options['users']:
+            raise CommandError('Авторов не может быть больше пользователей.')
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', stdout=self.stdout)
+        seed = options['seed']
+        users = get_or_create_authors(options['users'])
+        authors = users[:options['authors']]
+        self.step('Рецептов создано', lambda: generate_recipes(
+            authors, options['recipes'], seed=seed,
+            batch_size=options['batch_size']
+        ))
+        recipes = list(Recipe.objects.order_by('id').values_list(
+            'id', flat=True
+        ))
+        random.Random(seed).shuffle(recipes)
+        self.step('Подписок', lambda: generate_links(
+            Follow, 'author', users, authors, options['follows'],
+            seed=seed, allow_self=False
+        ))
+        self.step('Избранного', lambda: generate_links(
+            FavoriteRecipe, 'recipe', users, recipes, options['favorites'],
+            seed=seed + 1
+        ))
+        self.step('Рецептов в корзинах', lambda: generate_links(
+            ShoppingList, 'recipe', users, recipes, options['carts'],
+            seed=seed + 2
+        ))
+        # Связи вставлены в обход API: счетчики и списки покупок
+        # пересчитываются целиком, закэшированные ответы сбрасываются.
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
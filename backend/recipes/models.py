@@ -1,13 +1,134 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Case, Count, Exists, F, OuterRef, Prefetch, Q,
+                              Subquery, Value, When)
+from django.db.models.functions import Greatest
 
 from ingredients.models import Ingredient
 from tags.models import Tag
+from users.models import Follow
+
+from .images import image_storage
 
 User = get_user_model()
 
 
+def change_counters(queryset, **deltas):
+    """UPDATE ... SET field = field + delta без чтения строк в Python.
+
+    Уменьшение не опускает счетчик ниже нуля: связи, созданные в обход
+    API до пересчета (reconcile_counters), в счетчиках не учтены.
+    """
+    return queryset.update(**{
+        field: F(field) + delta if delta >= 0
+        else Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_user_data(self, user):
+        authors = User.objects.all()
+        queryset = self
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_favorited=Exists(FavoriteRecipe.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+                is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+            )
+            authors = authors.annotate(
+                is_subscribed=Exists(Follow.objects.filter(
+                    user=user, author=OuterRef('pk')
+                ))
+            )
+        # Названия тегов и ингредиентов берутся из справочников в памяти,
+        # поэтому из базы нужны только их id.
+        return queryset.prefetch_related(
+            Prefetch('author', queryset=authors),
+            Prefetch('tags', queryset=Tag.objects.only('id')),
+            Prefetch(
+                'amount_ingredients',
+                queryset=AmountIngredient.objects.order_by()
+            ),
+        )
+
+    def with_ingredients_from(self, ingredient_ids, max_missing=None):
+        """Рецепты, где есть хотя бы один ингредиент из ingredient_ids,
+        от тех, где недостает меньше всего ингредиентов.
+
+        matched - сколько ингредиентов рецепта есть в ingredient_ids,
+        missing - сколько не хватает. Оба считаются подзапросами по
+        ингредиентам самого рецепта, без GROUP BY по рецептам: так фильтр
+        сочетается с другими фильтрами и аннотациями, в том числе с рангом
+        полнотекстового поиска, и не зависит от счетчика ingredients_count.
+        """
+        have = Q(ingredient_id__in=ingredient_ids)
+        amounts = AmountIngredient.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe')
+        queryset = self.filter(
+            pk__in=AmountIngredient.objects.filter(have).values('recipe_id')
+        ).annotate(
+            matched=Subquery(amounts.annotate(
+                total=Count('pk', filter=have)
+            ).values('total')),
+            missing=Subquery(amounts.annotate(
+                total=Count('pk', filter=~have)
+            ).values('total')),
+        )
+        if max_missing is not None:
+            queryset = queryset.filter(missing__lte=max_missing)
+        return queryset.order_by('missing', '-matched', '-pub_date', '-id')
+
+    latest_batch_size = 100
+
+    def latest_by_author(self, author_ids, limit=None):
+        """Последние limit рецептов каждого автора.
+
+        Возвращает {author_id: [рецепты от новых к старым]}.
+        """
+        latest = {author_id: [] for author_id in author_ids}
+        if limit == 0:
+            # Срез [:0] Django не превращает в SQL (EmptyResultSet).
+            return latest
+        if limit is None:
+            recipes = self.filter(author_id__in=author_ids).order_by(
+                '-pub_date', '-id'
+            )
+        else:
+            recipes = []
+            author_ids = list(latest)
+            for start in range(0, len(author_ids), self.latest_batch_size):
+                recipes.extend(self.latest_of_authors(
+                    author_ids[start:start + self.latest_batch_size], limit
+                ))
+            recipes.sort(
+                key=lambda recipe: (recipe.pub_date, recipe.id), reverse=True
+            )
+        for recipe in recipes:
+            latest[recipe.author_id].append(recipe)
+        return latest
+
+    def latest_of_authors(self, author_ids, limit):
+        # Отдельный SELECT ... LIMIT на автора читает по индексу (author,
+        # pub_date) только его последние рецепты, а ROW_NUMBER() пришлось
+        # бы считать по всем рецептам всех авторов. Подзапросы
+        # объединяются в один UNION ALL.
+        parts = []
+        params = []
+        for number, author_id in enumerate(author_ids):
+            sql, author_params = self.filter(author_id=author_id).order_by(
+                '-pub_date', '-id'
+            )[:limit].query.sql_with_params()
+            parts.append(f'SELECT * FROM ({sql}) latest_{number}')
+            params.extend(author_params)
+        return self.raw(' UNION ALL '.join(parts), params)
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -22,6 +143,12 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Изображение рецепта',
         upload_to='recipes/',
+        storage=image_storage,
+    )
+    has_thumbnails = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Миниатюры созданы'
     )
     text = models.TextField(
         verbose_name='Текст рецепта',
@@ -45,11 +172,38 @@ class Recipe(models.Model):
         verbose_name='Дата создания',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    ingredients_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество ингредиентов'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -69,6 +223,7 @@ class AmountIngredient(models.Model):
         Recipe,
         verbose_name='Рецепт',
         on_delete=models.CASCADE,
+        related_name='amount_ingredients',
     )
 
     class Meta:
@@ -142,3 +297,115 @@ class ShoppingList(models.Model):
 
     def __str__(self):
         return f'{self.recipe} в списке покупок у {self.user}'
+
+
+class ShoppingListIngredientManager(models.Manager):
+    def add_recipe(self, user, recipe):
+        self.add_recipes(user, [recipe])
+
+    def remove_recipe(self, user, recipe):
+        self.remove_recipes(user, [recipe])
+
+    def add_recipes(self, user, recipes):
+        self.apply([user.id], recipe_amounts(*recipes))
+
+    def remove_recipes(self, user, recipes):
+        amounts = recipe_amounts(*recipes)
+        self.apply(
+            [user.id],
+            {ingredient: -amount for ingredient, amount in amounts.items()}
+        )
+
+    def change_recipe(self, recipe, deltas):
+        user_ids = list(ShoppingList.objects.filter(
+            recipe=recipe
+        ).values_list('user_id', flat=True))
+        self.apply(user_ids, deltas)
+
+    def apply(self, user_ids, deltas):
+        deltas = {
+            ingredient: delta for ingredient, delta in deltas.items() if delta
+        }
+        if not user_ids or not deltas:
+            return
+        with transaction.atomic():
+            self.bulk_create(
+                [
+                    self.model(user_id=user_id, ingredient_id=ingredient)
+                    for user_id in user_ids
+                    for ingredient, delta in deltas.items() if delta > 0
+                ],
+                ignore_conflicts=True
+            )
+            rows = self.filter(user_id__in=user_ids, ingredient_id__in=deltas)
+            rows.update(amount=F('amount') + Case(
+                *(
+                    When(ingredient_id=ingredient, then=Value(delta))
+                    for ingredient, delta in deltas.items()
+                ),
+                output_field=models.IntegerField()
+            ))
+            rows.filter(amount__lte=0).delete()
+
+    def totals_from_carts(self):
+        return ShoppingList.objects.values_list(
+            'user', 'recipe__amount_ingredients__ingredient'
+        ).annotate(
+            amount=models.Sum('recipe__amount_ingredients__amount')
+        ).filter(amount__isnull=False).order_by()
+
+
+def amount_deltas(old_amounts, new_amounts):
+    return {
+        ingredient: new_amounts.get(ingredient, 0) - old_amounts.get(
+            ingredient, 0
+        )
+        for ingredient in old_amounts.keys() | new_amounts.keys()
+    }
+
+
+def recipe_amounts(*recipes):
+    if len(recipes) == 1:
+        return dict(AmountIngredient.objects.filter(
+            recipe=recipes[0]
+        ).values_list('ingredient_id', 'amount'))
+    return dict(AmountIngredient.objects.filter(
+        recipe__in=recipes
+    ).values_list('ingredient_id').annotate(
+        amount=models.Sum('amount')
+    ).order_by())
+
+
+class ShoppingListIngredient(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_ingredients',
+        verbose_name='Покупатель'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_ingredients',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(
+        default=0,
+        verbose_name='Количество ингредиента'
+    )
+
+    objects = ShoppingListIngredientManager()
+
+    class Meta:
+        verbose_name = "Ингредиент в списке покупок"
+        verbose_name_plural = "Ингредиенты в списках покупок"
+        ordering = ['user']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} в списке покупок у {self.user}'
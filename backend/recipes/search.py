@@ -0,0 +1,237 @@
+import re
+
+from django.db import connections, transaction
+from django.db.models import Q
+
+from ingredients.models import Ingredient
+
+from .models import AmountIngredient, Recipe
+
+SEARCH_TABLE = 'recipes_recipesearch'
+WORD = re.compile(r'\w+')
+
+
+def tables():
+    return {
+        'search': SEARCH_TABLE,
+        'recipe': Recipe._meta.db_table,
+        'amount': AmountIngredient._meta.db_table,
+        'ingredient': Ingredient._meta.db_table,
+    }
+
+
+class PostgresSearchIndex:
+    """tsvector с русской морфологией в отдельной таблице с GIN-индексом.
+
+    Название весит больше ингредиентов, ингредиенты - больше текста.
+    """
+
+    def supported(self, cursor):
+        return True
+
+    def install(self, cursor):
+        # Без внешнего ключа: таблицы нет в моделях, и TRUNCATE рецептов
+        # (manage.py flush, тесты) не смог бы ее учесть.
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS {search} ('
+            'recipe_id bigint PRIMARY KEY, '
+            'document tsvector NOT NULL)'.format(**tables())
+        )
+        cursor.execute(
+            'ALTER TABLE {search} '
+            'DROP CONSTRAINT IF EXISTS {search}_recipe_id_fkey'.format(
+                **tables()
+            )
+        )
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS {search}_document_idx '
+            'ON {search} USING gin (document)'.format(**tables())
+        )
+
+    def update(self, cursor, recipe_ids):
+        cursor.execute(
+            'INSERT INTO {search} (recipe_id, document) '
+            "SELECT r.id, setweight(to_tsvector('russian', r.name), 'A') "
+            "|| setweight(to_tsvector('russian', coalesce("
+            "string_agg(i.name, ' '), '')), 'B') "
+            "|| setweight(to_tsvector('russian', r.text), 'C') "
+            'FROM {recipe} r '
+            'LEFT JOIN {amount} a ON a.recipe_id = r.id '
+            'LEFT JOIN {ingredient} i ON i.id = a.ingredient_id '
+            'WHERE r.id = ANY(%s) GROUP BY r.id '
+            'ON CONFLICT (recipe_id) '
+            'DO UPDATE SET document = EXCLUDED.document'.format(**tables()),
+            [list(recipe_ids)]
+        )
+
+    def delete(self, cursor, recipe_ids):
+        cursor.execute(
+            'DELETE FROM {search} WHERE recipe_id = ANY(%s)'.format(
+                **tables()
+            ),
+            [list(recipe_ids)]
+        )
+
+    def clear(self, cursor):
+        cursor.execute('TRUNCATE {search}'.format(**tables()))
+
+    def search(self, queryset, query):
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[
+                '{search}.recipe_id = {recipe}.id'.format(**tables()),
+                "{search}.document @@ plainto_tsquery('russian', %s)".format(
+                    **tables()
+                ),
+            ],
+            params=[query],
+            select={'search_rank': (
+                "ts_rank({search}.document, plainto_tsquery('russian', %s))"
+            ).format(**tables())},
+            select_params=[query],
+        )
+
+
+class SQLiteSearchIndex:
+    """Таблица FTS5; вместо морфологии - поиск слов по префиксу."""
+
+    def supported(self, cursor):
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+    def install(self, cursor):
+        cursor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS {search} USING fts5('
+            'name, ingredients, text, '
+            "tokenize = 'unicode61 remove_diacritics 2')".format(**tables())
+        )
+
+    def update(self, cursor, recipe_ids):
+        self.delete(cursor, recipe_ids)
+        cursor.execute(
+            'INSERT INTO {search} (rowid, name, ingredients, text) '
+            "SELECT r.id, r.name, coalesce(group_concat(i.name, ' '), ''), "
+            'r.text FROM {recipe} r '
+            'LEFT JOIN {amount} a ON a.recipe_id = r.id '
+            'LEFT JOIN {ingredient} i ON i.id = a.ingredient_id '
+            'WHERE r.id IN ({ids}) GROUP BY r.id'.format(
+                ids=', '.join(['%s'] * len(recipe_ids)), **tables()
+            ),
+            list(recipe_ids)
+        )
+
+    def delete(self, cursor, recipe_ids):
+        cursor.execute(
+            'DELETE FROM {search} WHERE rowid IN ({ids})'.format(
+                ids=', '.join(['%s'] * len(recipe_ids)), **tables()
+            ),
+            list(recipe_ids)
+        )
+
+    def clear(self, cursor):
+        cursor.execute('DELETE FROM {search}'.format(**tables()))
+
+    def match_expression(self, query):
+        return ' '.join(
+            '"{}"*'.format(word) for word in WORD.findall(query.lower())
+        )
+
+    def search(self, queryset, query):
+        # bm25 меньше у более релевантных строк; веса - name, ingredients,
+        # text.
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[
+                '{search}.rowid = {recipe}.id'.format(**tables()),
+                '{search} MATCH %s'.format(**tables()),
+            ],
+            params=[self.match_expression(query)],
+            select={
+                'search_rank': '-bm25({search}, 10.0, 4.0, 1.0)'.format(
+                    **tables()
+                ),
+            },
+        )
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchIndex,
+    'sqlite': SQLiteSearchIndex,
+}
+available = {}
+
+
+def get_index(using='default'):
+    """Индекс для базы using или None, если она не поддерживается."""
+    if using not in available:
+        backend = BACKENDS.get(connections[using].vendor)
+        index = None
+        if backend is not None:
+            with connections[using].cursor() as cursor:
+                if backend().supported(cursor):
+                    index = backend()
+        available[using] = index
+    return available[using]
+
+
+def install(using='default', **kwargs):
+    """Создает таблицу индекса; подключается к сигналу post_migrate."""
+    index = get_index(using)
+    if index is not None:
+        with connections[using].cursor() as cursor:
+            index.install(cursor)
+
+
+def update_search_index(recipe_ids, using='default'):
+    index = get_index(using)
+    recipe_ids = list(recipe_ids)
+    if index is not None and recipe_ids:
+        with connections[using].cursor() as cursor:
+            index.update(cursor, recipe_ids)
+
+
+def delete_from_search_index(recipe_ids, using='default'):
+    index = get_index(using)
+    recipe_ids = list(recipe_ids)
+    if index is not None and recipe_ids:
+        with connections[using].cursor() as cursor:
+            index.delete(cursor, recipe_ids)
+
+
+@transaction.atomic
+def rebuild_search_index(batch_size=1000, using='default'):
+    index = get_index(using)
+    if index is None:
+        return 0
+    with connections[using].cursor() as cursor:
+        index.clear(cursor)
+    ids = Recipe.objects.using(using).order_by('id').values_list(
+        'id', flat=True
+    )
+    total = 0
+    last_id = 0
+    while True:
+        batch = list(ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return total
+        update_search_index(batch, using)
+        total += len(batch)
+        last_id = batch[-1]
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под query, от более релевантных к менее."""
+    index = get_index(queryset.db)
+    if index is None:
+        return queryset.filter(
+            Q(name__icontains=query)
+            | Q(text__icontains=query)
+            | Q(ingredients__name__icontains=query)
+        ).distinct()
+    if not WORD.search(query):
+        return queryset.none()
+    # Таблица индекса присоединяется к запросу через extra(): ранжирование
+    # считается в том же проходе, что и поиск, а не подзапросом на строку.
+    return index.search(queryset, query).order_by(
+        '-search_rank', '-pub_date', '-id'
+    )
@@ -0,0 +1,16 @@
+from django.db.models.signals import pre_delete
+
+from .models import (Recipe, ShoppingListIngredient, amount_deltas,
+                     recipe_amounts)
+
+
+def recipe_deleted(sender, instance, **kwargs):
+    # Корзины удаляются каскадом вместе с рецептом, в том числе при
+    # удалении автора; до этого его ингредиенты вычитаются из списков.
+    ShoppingListIngredient.objects.change_recipe(
+        instance, amount_deltas(recipe_amounts(instance), {})
+    )
+
+
+def connect():
+    pre_delete.connect(recipe_deleted, sender=Recipe)
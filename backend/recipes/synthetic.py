@@ -0,0 +1,210 @@
+import random
+from collections import Counter
+from io import BytesIO
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from PIL import Image
+
+from ingredients.models import Ingredient
+from tags.models import Tag
+
+from .images import generate_thumbnails, image_storage
+from .models import AmountIngredient, Recipe, change_counters
+from .search import update_search_index
+
+User = get_user_model()
+
+WORDS = (
+    'быстрый домашний летний зимний острый сладкий пряный нежный '
+    'хрустящий сытный легкий праздничный постный деревенский бабушкин '
+    'суп салат пирог запеканка рагу каша соус омлет блины котлеты паста '
+    'плов борщ жаркое десерт пюре тушеный жареный печеный вареный '
+    'маринованный свежий ароматный сливочный овощной мясной рыбный '
+    'грибной ягодный фруктовый ореховый сырный картофельный'
+).split()
+
+
+def synthetic_image():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), 'orange').save(buffer, 'PNG')
+    return image_storage.save(
+        'recipes/synthetic.png', ContentFile(buffer.getvalue())
+    )
+
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+def synthetic_text(generator, words, vocabulary=WORDS):
+    return ' '.join(generator.choice(vocabulary) for _ in range(words))
+
+
+def zipf_weights(count, exponent=1.0):
+    """Накопленные веса закона Ципфа: первый элемент популярнее всех."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def pick(generator, population, weights, count):
+    """До count разных элементов population с весами weights."""
+    return list(dict.fromkeys(
+        generator.choices(population, cum_weights=weights, k=count)
+    ))
+
+
+def get_or_create_tags():
+    if not Tag.objects.exists():
+        Tag.objects.bulk_create(
+            Tag(name=name, color=color, slug=slug)
+            for name, color, slug in TAGS
+        )
+    return list(Tag.objects.values_list('id', flat=True))
+
+
+def generate_recipes(authors, count, seed=0, batch_size=1000):
+    """Создает count рецептов со случайными названиями, текстом, тегами и
+    ингредиентами у авторов из authors (список id).
+
+    Авторы и ингредиенты выбираются по закону Ципфа: первые авторы списка
+    пишут больше всех, а часть ингредиентов встречается почти везде.
+    id назначаются заранее, чтобы пачки работали и на SQLite, где
+    bulk_create не возвращает первичные ключи.
+    """
+    generator = random.Random(seed)
+    ingredients = dict(Ingredient.objects.values_list('id', 'name'))
+    if not ingredients:
+        raise ValueError('Нет ингредиентов, сначала load_ingredients.')
+    # Слова из названий ингредиентов делают текст разнообразнее, иначе
+    # любое слово встречается в половине рецептов.
+    vocabulary = sorted({
+        word for name in ingredients.values() for word in name.split()
+    })
+    ingredients = list(ingredients)
+    generator.shuffle(ingredients)
+    ingredient_weights = zipf_weights(len(ingredients))
+    author_weights = zipf_weights(len(authors))
+    tags = get_or_create_tags()
+    image = synthetic_image()
+    next_id = (Recipe.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0) + 1
+    ids = iter(range(next_id, next_id + count))
+    per_author = Counter()
+    while True:
+        batch = list(islice(ids, batch_size))
+        if not batch:
+            break
+        batch_authors = generator.choices(
+            authors, cum_weights=author_weights, k=len(batch)
+        )
+        per_author.update(batch_authors)
+        batch_ingredients = [
+            pick(
+                generator, ingredients, ingredient_weights,
+                generator.randint(3, 10)
+            )
+            for _ in batch
+        ]
+        with transaction.atomic():
+            Recipe.objects.bulk_create(
+                Recipe(
+                    id=pk,
+                    author_id=author,
+                    name=synthetic_text(generator, 3).capitalize(),
+                    text=synthetic_text(generator, 10) + ' ' + (
+                        synthetic_text(generator, 30, vocabulary)
+                    ),
+                    cooking_time=generator.randint(5, 180),
+                    image=image,
+                    ingredients_count=len(recipe_ingredients),
+                )
+                for pk, author, recipe_ingredients in zip(
+                    batch, batch_authors, batch_ingredients
+                )
+            )
+            AmountIngredient.objects.bulk_create(
+                AmountIngredient(
+                    recipe_id=pk, ingredient_id=ingredient,
+                    amount=generator.randint(1, 500)
+                )
+                for pk, recipe_ingredients in zip(batch, batch_ingredients)
+                for ingredient in recipe_ingredients
+            )
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=pk, tag_id=tag)
+                for pk in batch
+                for tag in generator.sample(
+                    tags, generator.randint(1, len(tags))
+                )
+            )
+            update_search_index(batch)
+        reset_sequences(Recipe, AmountIngredient)
+    generate_thumbnails(image)
+    for author, recipes in per_author.items():
+        change_counters(User.objects.filter(pk=author), recipes_count=recipes)
+    return sum(per_author.values())
+
+
+def reset_sequences(*models):
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def get_or_create_authors(count, prefix='synthetic'):
+    users = User.objects.filter(
+        username__startswith=f'{prefix}-'
+    ).order_by('id').values_list('id', flat=True)
+    existing = users.count()
+    if existing < count:
+        User.objects.bulk_create(
+            User(
+                username=f'{prefix}-{number}',
+                email=f'{prefix}-{number}@example.com',
+                first_name='Автор',
+                last_name=str(number),
+            )
+            for number in range(existing, count)
+        )
+    return list(users[:count])
+
+
+def generate_links(model, field, users, targets, per_user, seed=0,
+                   batch_size=5000, allow_self=True):
+    """Связи model(user, field) - подписки, избранное, корзины.
+
+    У пользователя в среднем per_user связей (экспоненциальное
+    распределение), цели выбираются по закону Ципфа в порядке targets.
+    Уже существующие связи пропускаются. Возвращает число попыток вставки.
+    """
+    if per_user <= 0 or not targets:
+        return 0
+    generator = random.Random(seed)
+    weights = zipf_weights(len(targets))
+    links = (
+        model(user_id=user, **{f'{field}_id': target})
+        for user in users
+        for target in pick(
+            generator, targets, weights,
+            min(len(targets), round(generator.expovariate(1 / per_user)))
+        )
+        if allow_self or target != user
+    )
+    total = 0
+    while True:
+        batch = list(islice(links, batch_size))
+        if not batch:
+            return total
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
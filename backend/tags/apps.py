@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class TagsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tags'
     verbose_name = 'Тэги'
+
+    def ready(self):
+        from .catalog import TAGS
+        from .models import Tag
+
+        post_save.connect(TAGS.invalidate, sender=Tag)
+        post_delete.connect(TAGS.invalidate, sender=Tag)
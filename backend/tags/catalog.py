@@ -0,0 +1,10 @@
+from foodgram.catalogs import Catalog
+
+TAGS = Catalog('tags.Tag', ('name', 'color', 'slug'))
+
+
+def tag_ids_by_slug():
+    """{slug: id} тегов из справочника в памяти."""
+    return TAGS.derive('ids_by_slug', lambda items: {
+        slug: pk for pk, (name, color, slug) in items.items()
+    })